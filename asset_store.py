@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import load_csv
+
+# Many symbols on one sorted int64 timeline, with as-of alignment.
+#
+# Each symbol is stored once as a sorted array of int64 nanosecond timestamps
+# plus one array per column. Aligning a set of symbols picks a timeline (the
+# timestamps they share, all of them, or one symbol's own calendar) and, per
+# symbol, finds the last observation at or before every timeline point with
+# one np.searchsorted. Those positions are memoized per (symbols, how, freq),
+# so scanning many column combinations or strategies over the same pair costs
+# one alignment; building a frame afterwards is only array takes.
+
+
+def _as_int64(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.as_unit('ns').asi8
+
+
+# Fill for timeline points a symbol has no observation for, by dtype kind
+_MISSING = {'f': np.nan, 'c': np.nan, 'M': np.datetime64('NaT'), 'm': np.timedelta64('NaT'), 'O': None}
+
+
+def _with_missing(values):
+    # A copy of `values` in a dtype that can hold a missing value: integers
+    # become float as when pandas reindexes, booleans and strings object
+    if values.dtype.kind in 'iu':
+        return values.astype(float)
+    if values.dtype.kind not in _MISSING:
+        return values.astype(object)
+    return values.copy()
+
+
+class AssetStore:
+    """
+    Price series for many symbols with memoized as-of alignment.
+
+    Alignment modes (`how`):
+        'inner': only timestamps every symbol has (pd.merge's inner join).
+        'outer': every timestamp any symbol has; symbols without a bar there
+            carry their last known value (NaN before their first bar).
+        <symbol>: the given symbol's own calendar, other symbols as-of. Use the
+            traded symbol here so no bar of it is dropped.
+
+    `freq` (a fixed frequency such as '1h' or '1D') buckets the timeline and
+    takes each symbol's last value at or before the end of every bucket.
+    """
+
+    def __init__(self):
+        self.timestamps = {}
+        self.columns = {}
+        self.tz = None
+        self._alignments = {}
+
+    @property
+    def symbols(self):
+        return list(self.timestamps)
+
+    def add(self, symbol, frame):
+        """
+        Add or replace a symbol from a DataFrame indexed by date.
+
+        Args:
+            symbol (str): Name of the series, used as the column suffix.
+            frame (pd.DataFrame): Rows indexed by a DatetimeIndex, in any order.
+        """
+        timestamps = _as_int64(frame.index)
+        order = np.argsort(timestamps, kind='stable')
+        self.timestamps[symbol] = timestamps[order]
+        self.columns[symbol] = {name: frame[name].to_numpy()[order] for name in frame.columns}
+        if self.tz is None:
+            self.tz = frame.index.tz
+        # Cached positions for this symbol are stale now
+        self._alignments = {key: value for key, value in self._alignments.items() if symbol not in key[0]}
+
+    def load(self, symbol, file_path, date_column='Date', **load_kwargs):
+        """Add a symbol from a CSV through data_loader.load_csv."""
+        self.add(symbol, load_csv(file_path, parse_dates=[date_column], index_col=date_column, **load_kwargs))
+
+    def _timeline(self, symbols, how, freq):
+        if how == 'inner':
+            grid = self.timestamps[symbols[0]]
+            for symbol in symbols[1:]:
+                grid = np.intersect1d(grid, self.timestamps[symbol])
+        elif how == 'outer':
+            grid = np.unique(np.concatenate([self.timestamps[symbol] for symbol in symbols]))
+        elif how in self.timestamps:
+            grid = self.timestamps[how]
+        else:
+            raise ValueError(f"how must be 'inner', 'outer' or a symbol name, got {how!r}")
+        if freq is None:
+            return grid, grid
+        step = pd.Timedelta(freq).value
+        grid = np.unique(grid - grid % step)
+        return grid, grid + (step - 1)
+
+    def alignment(self, symbols, how='inner', freq=None):
+        """
+        Timeline and per-symbol as-of positions, computed once per (symbols, how, freq).
+
+        Returns:
+            tuple: (timeline, positions) where timeline is int64 nanoseconds and
+            positions maps each symbol to the index of its last observation at
+            or before each timeline point (-1 where it has none yet).
+        """
+        key = (tuple(symbols), how, freq)
+        if key not in self._alignments:
+            grid, cutoff = self._timeline(list(symbols), how, freq)
+            positions = {
+                symbol: np.searchsorted(self.timestamps[symbol], cutoff, side='right') - 1 for symbol in symbols
+            }
+            self._alignments[key] = (grid, positions)
+        return self._alignments[key]
+
+    def index(self, symbols, how='inner', freq=None):
+        """The aligned timeline as a DatetimeIndex."""
+        index = pd.DatetimeIndex(self.alignment(symbols, how, freq)[0].view('M8[ns]'), name='Date')
+        return index if self.tz is None else index.tz_localize('UTC').tz_convert(self.tz)
+
+    def column(self, symbol, name, symbols=None, how='inner', freq=None, lag=0):
+        """
+        One symbol's column on an aligned timeline.
+
+        Args:
+            symbol (str): Symbol to read.
+            name (str): Column to read.
+            symbols (list): Symbols defining the timeline; defaults to [symbol].
+            lag (int): Read the observation `lag` bars earlier in the symbol's own
+                series (negative values lead). Points without one are NaN for
+                numeric columns, NaT for dates and None for other columns.
+
+        Returns:
+            np.ndarray: Values aligned to the timeline.
+        """
+        positions = self.alignment(symbols or [symbol], how, freq)[1][symbol] - lag
+        values = self.columns[symbol][name]
+        missing = (positions < 0) | (positions >= len(values))
+        if not missing.any():
+            return values[positions]
+        aligned = _with_missing(values[np.clip(positions, 0, max(len(values) - 1, 0))])
+        aligned[missing] = _MISSING.get(aligned.dtype.kind)
+        return aligned
+
+    def align(self, symbols, columns=None, how='inner', freq=None):
+        """
+        Aligned DataFrame of several symbols.
+
+        Args:
+            symbols (list): Symbols to align, in column order.
+            columns (list): Columns to take from each symbol; defaults to all of them.
+
+        Returns:
+            pd.DataFrame: Columns named '<column>_<symbol>', indexed by Date.
+        """
+        data = {}
+        for symbol in symbols:
+            for name in columns or self.columns[symbol]:
+                data[f'{name}_{symbol}'] = self.column(symbol, name, symbols, how, freq)
+        return pd.DataFrame(data, index=self.index(symbols, how, freq))
@@ -0,0 +1,141 @@
+import numpy as np
+
+# First-barrier-hit lookups for stop-loss / take-profit exits.
+#
+# The strategies resolve a trade by scanning forward from the entry bar until
+# price touches either the stop loss or the take profit. Doing that with a
+# nested loop is quadratic in the number of bars. Instead we precompute sparse
+# tables of running minima/maxima once and answer "first bar at or after
+# `start` where price <= level" (or >= level) by binary lifting, which costs
+# O(log n) per query and is vectorised over every entry at once.
+
+
+def _build_table(values, op):
+    # table[k][i] = op over values[i : i + 2**k]; NaNs are ignored by fmin/fmax
+    table = [values]
+    width = 1
+    while 2 * width <= len(values):
+        prev = table[-1]
+        table.append(op(prev[:-width], prev[width:]))
+        width *= 2
+    return table
+
+
+def _first_hit(table, n, start, level, hit):
+    start = np.asarray(start, dtype=np.int64)
+    level = np.asarray(level, dtype=float)
+    start, level = np.broadcast_arrays(start, level)
+    pos = start.copy()
+    if n == 0:
+        return np.minimum(pos, n)
+    for k in range(len(table) - 1, -1, -1):
+        width = 1 << k
+        row = table[k]
+        fits = pos + width <= n
+        block = row[np.where(fits, pos, 0)]
+        # Jump over the block when it is entirely on the safe side of the level
+        # (NaN levels or NaN-only blocks never count as a hit).
+        pos = np.where(fits & ~hit(block, level), pos + width, pos)
+    return np.minimum(pos, n)
+
+
+class BarrierIndex:
+    """
+    Precomputed index answering first-touch queries over a price series.
+
+    Args:
+        lows (array-like): Series checked by `first_at_or_below` (e.g. Low or Close).
+        highs (array-like): Series checked by `first_at_or_above`. Defaults to `lows`.
+
+    Queries accept scalars or arrays for `start` and `level` and return the
+    positional index of the first hit, or `len(series)` when the level is never
+    touched.
+    """
+
+    def __init__(self, lows, highs=None):
+        lows = np.asarray(lows, dtype=float)
+        highs = lows if highs is None else np.asarray(highs, dtype=float)
+        if len(lows) != len(highs):
+            raise ValueError("lows and highs must have the same length.")
+        self.n = len(lows)
+        self._min_table = _build_table(lows, np.fmin)
+        self._max_table = _build_table(highs, np.fmax)
+
+    def first_at_or_below(self, start, level):
+        """Return the first position >= start where lows <= level."""
+        return _first_hit(self._min_table, self.n, start, level, np.less_equal)
+
+    def first_at_or_above(self, start, level):
+        """Return the first position >= start where highs >= level."""
+        return _first_hit(self._max_table, self.n, start, level, np.greater_equal)
+
+
+def first_barrier_hits(index, start, stop_loss, take_profit, direction, stop_wins_ties=True):
+    """
+    Resolve the exit bar of many trades in one batched pass.
+
+    Args:
+        index (BarrierIndex): Index over the prices the barriers are checked against.
+        start (array-like): First bar on which each trade can exit (usually entry + 1).
+        stop_loss (array-like): Stop loss level of each trade.
+        take_profit (array-like): Take profit level of each trade.
+        direction (array-like): 1 for long trades, -1 for short trades.
+        stop_wins_ties (bool): Which barrier wins when both are touched on the same bar.
+
+    Returns:
+        tuple: (exit_index, stop_hit) arrays. exit_index is `index.n` for trades
+        that never reach either barrier.
+    """
+    start = np.asarray(start, dtype=np.int64)
+    stop_loss = np.asarray(stop_loss, dtype=float)
+    take_profit = np.asarray(take_profit, dtype=float)
+    is_long = np.asarray(direction) > 0
+
+    # Longs stop out below and take profit above; shorts are the mirror image.
+    stop_idx = np.where(
+        is_long,
+        index.first_at_or_below(start, np.where(is_long, stop_loss, np.nan)),
+        index.first_at_or_above(start, np.where(is_long, np.nan, stop_loss)),
+    )
+    target_idx = np.where(
+        is_long,
+        index.first_at_or_above(start, np.where(is_long, take_profit, np.nan)),
+        index.first_at_or_below(start, np.where(is_long, np.nan, take_profit)),
+    )
+
+    if stop_wins_ties:
+        stop_hit = stop_idx <= target_idx
+    else:
+        stop_hit = stop_idx < target_idx
+    exit_idx = np.where(stop_hit, stop_idx, target_idx)
+    stop_hit &= exit_idx < index.n
+    return exit_idx, stop_hit
+
+
+def first_touch(prices, start, lower, upper, block=64):
+    """
+    Return the first position >= start where prices <= lower or prices >= upper.
+
+    Scans forward in geometrically growing blocks, so the cost follows how long
+    the trade stays open rather than how much history is left. Suited to
+    sequential simulators that resolve one trade at a time.
+
+    Args:
+        prices (np.ndarray): Float price array.
+        start (int): First position to check.
+        lower (float): Lower barrier (touched when price <= lower).
+        upper (float): Upper barrier (touched when price >= upper).
+        block (int): Size of the first block scanned.
+
+    Returns:
+        int: Position of the first touch, or len(prices) if neither is touched.
+    """
+    n = len(prices)
+    while start < n:
+        window = prices[start:start + block]
+        hits = np.flatnonzero((window <= lower) | (window >= upper))
+        if len(hits):
+            return start + int(hits[0])
+        start += block
+        block *= 2
+    return n
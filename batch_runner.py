@@ -0,0 +1,237 @@
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Run one strategy over many broker CSVs.
+#
+# Each file is backtested in its own worker process, and a file that fails
+# to load or backtest is recorded with its error instead of stopping the
+# batch. Per-symbol summaries are written to one results CSV and flushed as
+# each file finishes.
+#
+# Memory: every worker loads its whole file and indicator columns, as the
+# strategy script would, so peak memory is about `max_workers` times the
+# largest file's in-memory backtest (use chunked.py for files that do not
+# fit). Workers are recycled after every file so that peak is returned to
+# the OS rather than kept by a long-lived process. The parent only holds the
+# paths of the at most 2 * max_workers files in flight and one summary row
+# per finished file.
+
+SUMMARY_FIELDS = [
+    'strategy', 'symbol', 'timeframe', 'file', 'status', 'bars', 'trades',
+    'net_profit', 'pip_size', 'pip_value', 'seconds', 'error',
+]
+
+# Pip size and dollar value per pip for a standard lot. Symbols not listed
+# use DEFAULT_PIP_SIZE and DEFAULT_PIP_VALUE, except pairs quoted in yen:
+# their pip is JPY_PIP_SIZE and worth 1,000 yen per lot, so its dollar value
+# follows the exchange rate and has to be given (e.g. --spec USDJPY=0.01:6.7).
+DEFAULT_PIP_SIZE = 0.0001
+JPY_PIP_SIZE = 0.01
+DEFAULT_PIP_VALUE = 10
+SYMBOL_SPECS = {
+    'XAUUSD': (0.01, 1),
+}
+
+
+def parse_file_name(file_path):
+    """Split a broker export name like 'EURUSD_M5_mt.csv' into (symbol, timeframe)."""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    match = re.match(r'([A-Za-z]+)(?:_([A-Za-z]+\d+))?', name)
+    if not match:
+        return name, ''
+    return match.group(1).upper(), (match.group(2) or '').upper()
+
+
+def symbol_spec(symbol, overrides=None):
+    """
+    Return (pip_size, pip_value) for a symbol.
+
+    Raises:
+        ValueError: For a yen-quoted symbol without an override.
+    """
+    specs = {**SYMBOL_SPECS, **(overrides or {})}
+    if symbol in specs:
+        return specs[symbol]
+    if symbol.endswith('JPY'):
+        raise ValueError(
+            f"{symbol} is quoted in yen, so its dollar value per pip depends on the exchange rate; "
+            f"pass it as --spec {symbol}={JPY_PIP_SIZE}:<dollars per pip>."
+        )
+    return DEFAULT_PIP_SIZE, DEFAULT_PIP_VALUE
+
+
+# Strategy adapters: each loads one file and returns (bars, trades, net_profit).
+# Strategy modules are imported inside the adapters so workers only load what they run.
+
+def _run_mean_reversion(file_path, pip_size, pip_value):
+    import meanReversion
+
+    df = meanReversion.calculate_indicators(meanReversion.load_data(file_path))
+    trades, balance = meanReversion.run_backtest(
+        df['Close'], df['SMA50'], df['RSI'], pip_size=pip_size, pip_value=pip_value
+    )
+    return len(df), (len(trades) + 1) // 2, balance - 10000
+
+
+def _run_range(file_path, pip_size, pip_value):
+    import rangeTrading
+
+    df = rangeTrading.calculate_indicators(rangeTrading.load_data(file_path))
+    trades, balance = rangeTrading.run_backtest(
+        df['Close'], df['LowerBand'], df['UpperBand'], df['RSI'], df['ATR'], pip_size=pip_size, pip_value=pip_value
+    )
+    return len(df), (len(trades) + 1) // 2, balance - 10000
+
+
+def _run_trend_following(file_path, pip_size, pip_value):
+    import trendfollowingalgoAAA
+
+    data = trendfollowingalgoAAA.calculate_indicators(trendfollowingalgoAAA.load_data(file_path))
+    trades = trendfollowingalgoAAA.simulate_trades(data, pip_value=pip_size, pip_worth=pip_value)
+    return len(data), len(trades), sum(trades['Profit/Loss ($)'].tolist())
+
+
+def _run_ema_adx(file_path, pip_size, pip_value):
+    import ema_adx_algo
+
+    data = ema_adx_algo.calculate_indicators(ema_adx_algo.load_data(file_path))
+    trades, total_profit_loss = ema_adx_algo.simulate_trades(data, pip_size=pip_size, pip_value=pip_value)
+    return len(data), len(trades), total_profit_loss
+
+
+STRATEGIES = {
+    'mean_reversion': _run_mean_reversion,
+    'range': _run_range,
+    'trend_following': _run_trend_following,
+    'ema_adx': _run_ema_adx,
+}
+
+
+def run_symbol(strategy, file_path, pip_size, pip_value):
+    """Backtest one file and return its summary row; errors are captured in the row."""
+    symbol, timeframe = parse_file_name(file_path)
+    row = {
+        'strategy': strategy, 'symbol': symbol, 'timeframe': timeframe, 'file': file_path,
+        'pip_size': pip_size, 'pip_value': pip_value,
+    }
+    start = time.perf_counter()
+    try:
+        bars, trades, net_profit = STRATEGIES[strategy](file_path, pip_size, pip_value)
+        row.update(status='ok', bars=bars, trades=trades, net_profit=net_profit)
+    except Exception as e:
+        row.update(status='error', error=f'{type(e).__name__}: {e}')
+    row['seconds'] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_batch(strategy, pattern, output_file='batch_results.csv', max_workers=None, symbol_specs=None):
+    """
+    Run `strategy` over every CSV matching `pattern`.
+
+    Args:
+        strategy (str): One of STRATEGIES.
+        pattern (str): Glob of input CSV files.
+        output_file (str): Consolidated summary CSV, appended to as results arrive.
+        max_workers (int): Concurrent worker processes. Defaults to the CPU count.
+            Each holds one whole file in memory.
+        symbol_specs (dict): Symbol -> (pip_size, pip_value) overrides; required
+            for yen-quoted symbols.
+
+    Returns:
+        list: Summary rows in completion order.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Choose from {', '.join(STRATEGIES)}.")
+    files = sorted(glob.glob(pattern))
+    if not files:
+        print(f"No files match {pattern}")
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+
+    rows = []
+    pending = set()
+    queue = iter(files)
+    # Fresh worker per file so memory is returned to the OS between symbols
+    with open(output_file, 'w', newline='') as f, ProcessPoolExecutor(
+        max_workers, mp_context=multiprocessing.get_context('spawn'), max_tasks_per_child=1
+    ) as executor:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+
+        def record(row):
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            print(f"{row['symbol']} {row['timeframe']}: {row['status']}")
+
+        def record_failure(file_path, error):
+            symbol, timeframe = parse_file_name(file_path)
+            record({
+                'strategy': strategy, 'symbol': symbol, 'timeframe': timeframe, 'file': file_path,
+                'status': 'error', 'error': f'{type(error).__name__}: {error}',
+            })
+
+        def submit_next():
+            file_path = next(queue, None)
+            if file_path is None:
+                return False
+            try:
+                pip_size, pip_value = symbol_spec(parse_file_name(file_path)[0], symbol_specs)
+                future = executor.submit(run_symbol, strategy, file_path, pip_size, pip_value)
+            except Exception as e:
+                # No pip value for the symbol, or the pool is broken after a
+                # worker crash; record and move on
+                record_failure(file_path, e)
+                return True
+            future.file_path = file_path
+            pending.add(future)
+            return True
+
+        def top_up():
+            # Keep a bounded number of files in flight
+            while len(pending) < 2 * max_workers and submit_next():
+                pass
+
+        top_up()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                try:
+                    record(future.result())
+                except Exception as e:
+                    # The worker process itself died (e.g. out of memory)
+                    record_failure(future.file_path, e)
+            top_up()
+
+    print(f"Results for {len(rows)} files saved to {output_file}")
+    return rows
+
+
+def _parse_spec(text):
+    # SYMBOL=PIP_SIZE:PIP_VALUE, e.g. USDJPY=0.01:6.7
+    symbol, values = text.split('=')
+    pip_size, pip_value = values.split(':')
+    return symbol.upper(), (float(pip_size), float(pip_value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a strategy over a directory of broker CSVs.')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES))
+    parser.add_argument('pattern', help='Glob of input CSVs, e.g. "data/*_M30*.csv"')
+    parser.add_argument('--output', default='batch_results.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--spec', action='append', type=_parse_spec, default=[],
+                        help='Pip settings as SYMBOL=PIP_SIZE:PIP_VALUE (repeatable)')
+    args = parser.parse_args()
+    run_batch(args.strategy, args.pattern, args.output, args.workers, dict(args.spec))
+
+
+if __name__ == '__main__':
+    main()
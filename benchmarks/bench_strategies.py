@@ -0,0 +1,265 @@
+"""
+Time every strategy's indicator and simulation phases on synthetic bars.
+
+Each (strategy, bar count) runs in a fresh Python process, so the peak RSS
+reported is that case's own. Results can be saved as a JSON baseline and
+later runs compared against it; phases slower than the baseline by more than
+the tolerance are reported as regressions and make the exit status 1.
+
+Run from the repository root:
+    python -m benchmarks.bench_strategies --sizes 10000 100000 --save-baseline
+    python -m benchmarks.bench_strategies --sizes 10000 100000
+"""
+import argparse
+import contextlib
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlc
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+# Phases shorter than this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.01
+
+
+def _mean_reversion(data, phase):
+    import meanReversion
+
+    df = data.set_index("Date")[["Close"]]
+    with phase("indicators"):
+        df = meanReversion.calculate_indicators(df)
+    with phase("simulate"):
+        meanReversion.run_backtest(df["Close"], df["SMA50"], df["RSI"])
+
+
+def _range(data, phase):
+    import rangeTrading
+
+    df = data.set_index("Date")[["High", "Low", "Close"]]
+    with phase("indicators"):
+        df = rangeTrading.calculate_indicators(df)
+    with phase("simulate"):
+        rangeTrading.run_backtest(df["Close"], df["LowerBand"], df["UpperBand"], df["RSI"], df["ATR"])
+
+
+def _trend(data, phase):
+    import trendfollowingalgoAAA as trend
+
+    df = data[["Date", "Open", "High", "Low", "Close", "Volume"]].copy()
+    with phase("indicators"):
+        df = trend.calculate_indicators(df)
+    with phase("simulate"):
+        trend.simulate_trades(df)
+
+
+def _ema_adx(data, phase):
+    import ema_adx_algo
+
+    df = data[["Date", "Open", "High", "Low", "Close", "Volume"]].copy()
+    with phase("indicators"):
+        df = ema_adx_algo.calculate_indicators(df)
+    with phase("simulate"):
+        ema_adx_algo.simulate_trades(df)
+
+
+def _swing(data, phase):
+    import swingtradingalgoAA as swing
+
+    df = data.copy()
+    with phase("indicators"):
+        df = swing.find_support_resistance(swing.calculate_indicators(df))
+    with phase("simulate"):
+        swing.simulate_trades(df)
+
+
+def _commodity(data, phase):
+    import commoditycorrelation
+    from asset_store import AssetStore
+
+    # The index series gets its own walk, with every tenth bar missing so the
+    # join has something to drop
+    index = synthetic_ohlc(len(data), seed=1, start_price=100.0)
+    store = AssetStore()
+    store.add("XAU", data.set_index("Date"))
+    store.add("DXY", index.iloc[np.arange(len(index)) % 10 != 9].set_index("Date"))
+    with phase("align"):
+        df = store.align(["XAU", "DXY"], how="inner")
+    with phase("indicators"):
+        df = commoditycorrelation.calculate_indicators(df)
+    with phase("simulate"):
+        commoditycorrelation.simulate_trades(df)
+
+
+def _covered_call(data, phase):
+    from coveredcalloptions import option_pnl_surface
+
+    close = data["Close"].to_numpy() * 100
+    strikes = np.linspace(close.min(), close.max(), 20)
+    with phase("simulate"):
+        option_pnl_surface(close, strikes, np.linspace(0.5, 5, 10), cadences=(1, 5, 20))
+
+
+STRATEGIES = {
+    "mean_reversion": _mean_reversion,
+    "range": _range,
+    "trend": _trend,
+    "ema_adx": _ema_adx,
+    "swing": _swing,
+    "commodity": _commodity,
+    "covered_call": _covered_call,
+}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(strategy, bars, seed=0, volatility=0.0008):
+    """
+    Run one strategy on `bars` synthetic bars in this process.
+
+    Returns:
+        list: One dict per phase with seconds, bars_per_sec and peak_rss_mb
+        (the process peak after the run, including the generated data).
+    """
+    data = synthetic_ohlc(bars, seed=seed, volatility=volatility)
+    timings = {}
+
+    @contextlib.contextmanager
+    def phase(name):
+        start = time.perf_counter()
+        yield
+        timings[name] = time.perf_counter() - start
+
+    STRATEGIES[strategy](data, phase)
+    peak_rss_mb = _peak_rss_mb()
+    return [
+        {
+            "strategy": strategy,
+            "phase": name,
+            "bars": bars,
+            "seconds": seconds,
+            "bars_per_sec": bars / seconds if seconds > 0 else float("inf"),
+            "peak_rss_mb": peak_rss_mb,
+        }
+        for name, seconds in timings.items()
+    ]
+
+
+def _run_isolated(strategy, bars, seed, volatility, timeout):
+    command = [
+        sys.executable, "-m", "benchmarks.bench_strategies", "--worker", strategy, str(bars),
+        "--seed", str(seed), "--volatility", str(volatility),
+    ]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, f"timed out after {timeout}s"
+    if completed.returncode != 0:
+        return None, completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+    return json.loads(completed.stdout), None
+
+
+def _key(row):
+    return f"{row['strategy']}/{row['phase']}/{row['bars']}"
+
+
+def compare(results, baseline, tolerance):
+    """
+    Phases slower than the baseline by more than `tolerance` (a fraction).
+
+    Returns:
+        list: (key, baseline seconds, current seconds) per regression.
+    """
+    previous = {_key(row): row["seconds"] for row in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        before = previous.get(_key(row))
+        if before is None or max(before, row["seconds"]) < MIN_COMPARABLE_SECONDS:
+            continue
+        if row["seconds"] > before * (1 + tolerance):
+            regressions.append((_key(row), before, row["seconds"]))
+    return regressions
+
+
+def _environment(seed, volatility):
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "volatility": volatility,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--volatility", type=float, default=0.0008)
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--worker", nargs=2, metavar=("STRATEGY", "BARS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        strategy, bars = args.worker
+        print(json.dumps(run_case(strategy, int(bars), args.seed, args.volatility)))
+        return
+
+    results = []
+    print(f"{'strategy':<15}{'phase':<12}{'bars':>12}{'seconds':>11}{'bars/sec':>14}{'peak RSS MB':>13}")
+    for strategy in args.strategies:
+        for bars in args.sizes:
+            rows, error = _run_isolated(strategy, bars, args.seed, args.volatility, args.timeout)
+            if error:
+                print(f"{strategy:<15}{'':<12}{bars:>12,}  {error}")
+                continue
+            for row in rows:
+                rss = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "n/a"
+                print(f"{strategy:<15}{row['phase']:<12}{bars:>12,}{row['seconds']:>11.4f}"
+                      f"{row['bars_per_sec']:>14,.0f}{rss:>13}")
+            results.extend(rows)
+
+    report = {"environment": _environment(args.seed, args.volatility), "results": results}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    for key, before, after in regressions:
+        print(f"REGRESSION {key}: {before:.4f}s -> {after:.4f}s ({after / before - 1:+.0%})")
+    if not regressions:
+        print(f"No phase slower than the baseline by more than {args.tolerance:.0%}.")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
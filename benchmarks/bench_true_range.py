@@ -0,0 +1,50 @@
+"""
+Compare the row-wise ATR the swing script used to compute with the vectorised kernel.
+
+Run from the repository root:
+    python -m benchmarks.bench_true_range --bars 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_ohlc
+from indicators import atr
+
+
+def rowwise_atr(data):
+    # The original calculate_indicators implementation
+    return (
+        data[["High", "Low", "Close"]]
+        .apply(lambda x: max(x.iloc[0] - x.iloc[1], abs(x.iloc[0] - x.iloc[2]), abs(x.iloc[1] - x.iloc[2])), axis=1)
+        .rolling(window=14)
+        .mean()
+    )
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = synthetic_ohlc(args.bars)
+    rowwise, rowwise_time = timed(rowwise_atr, data)
+    legacy, legacy_time = timed(atr, data["High"], data["Low"], data["Close"], 14, legacy=True)
+    _, vector_time = timed(atr, data["High"], data["Low"], data["Close"], 14)
+
+    print(f"Bars: {args.bars:,}")
+    print(f"Row-wise apply:          {rowwise_time:8.3f} s")
+    print(f"Vectorised (legacy):     {legacy_time:8.3f} s  ({rowwise_time / legacy_time:,.0f}x)")
+    print(f"Vectorised (prev close): {vector_time:8.3f} s  ({rowwise_time / vector_time:,.0f}x)")
+    print(f"Legacy max abs diff vs row-wise: {np.nanmax(np.abs(legacy - rowwise.to_numpy())):.3g}")
+
+
+if __name__ == "__main__":
+    main()
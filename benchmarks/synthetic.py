@@ -0,0 +1,41 @@
+"""
+Seeded synthetic OHLCV bars for benchmarks.
+
+Closes follow a geometric random walk, so prices stay positive however many
+bars are generated; highs and lows extend past the open and close by a
+random fraction of the volatility.
+"""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlc(bars, seed=0, volatility=0.0008, start_price=1.0, start="2000-01-03", freq="1min"):
+    """
+    Random-walk OHLCV frame with a Date column.
+
+    Args:
+        bars (int): Number of bars.
+        seed (int): Random seed; the same arguments always give the same bars.
+        volatility (float): Standard deviation of the log return per bar.
+        start_price (float): Open of the first bar.
+        start (str): Date of the first bar.
+        freq (str): Spacing of the bars. One-minute bars keep 10M bars within
+            the range pandas timestamps can represent.
+
+    Returns:
+        pd.DataFrame: Date, Open, High, Low, Close and Volume columns.
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, bars)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, volatility / 2, bars)))
+    volume = rng.integers(100, 1000, bars)
+    return pd.DataFrame({
+        "Date": pd.date_range(start, periods=bars, freq=freq),
+        "Open": open_,
+        "High": high,
+        "Low": low,
+        "Close": close,
+        "Volume": volume,
+    })
@@ -0,0 +1,156 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import meanReversion
+import rangeTrading
+from ema_adx_live import TRADE_DTYPE, EmaAdxEngine, run_bars
+from indicators import StreamingATR, StreamingBollinger, StreamingRSI, StreamingSMA
+from trade_writer import TradeWriter
+
+# Out-of-core backtests for CSVs too large to load at once.
+#
+# The CSV is read in chunks of `chunksize` rows with only the columns a
+# strategy needs. The indicators are the streaming ones from indicators,
+# which carry their rolling windows from one chunk into the next and follow
+# pandas' rolling arithmetic exactly, so every indicator value is
+# bit-identical to a full in-memory run and no rows are read twice. The
+# strategy's position state and balance carry over from chunk to chunk too.
+# Peak memory depends on the chunk size, not on the length of the file.
+#
+# Trades go through a TradeWriter, so the output can also be Parquet, Arrow
+# or a columns directory (see trade_writer), chosen by the output path. It
+# writes in the same batches as the in-memory scripts, so the output files
+# are identical to theirs.
+
+PAIRED_FIELDS = [('type', 'U4'), ('price', 'f8'), ('date', 'M8[ns]'), ('profit_loss', 'f8')]
+
+# EmaAdxEngine's trade fields; Date is the bar's row number in the CSV
+EMA_ADX_FIELDS = [(name, 'i8' if name == 'Date' else TRADE_DTYPE[name]) for name in TRADE_DTYPE.names]
+
+
+def read_chunks(file_path, chunksize, usecols=None, parse_dates=(), index_col=None, **read_csv_kwargs):
+    """Yield DataFrame chunks of a CSV, with `parse_dates` converted and `index_col` set."""
+    with pd.read_csv(file_path, chunksize=chunksize, usecols=usecols, **read_csv_kwargs) as reader:
+        for chunk in reader:
+            for column in parse_dates:
+                chunk[column] = pd.to_datetime(chunk[column])
+            if index_col is not None:
+                chunk = chunk.set_index(index_col)
+            yield chunk
+
+
+def stream(indicator, *columns):
+    """
+    Feed aligned columns through a streaming indicator, one bar at a time.
+
+    Returns:
+        ndarray: The indicator's values, one row per output for indicators
+            that return a tuple.
+    """
+    bars = zip(*(np.asarray(column, dtype=float).tolist() for column in columns))
+    return np.array([indicator.update(*bar) for bar in bars], dtype=float).T
+
+
+def _run_paired(chunks, output_file, backtest):
+    # Driver for strategies whose ledger alternates entry and exit rows
+    # (meanReversion, rangeTrading). The writer always holds back its latest
+    # row, so an entry still open at the end of a chunk gets its profit_loss
+    # from the exit found in a later chunk.
+    state = {}
+    with TradeWriter(output_file, PAIRED_FIELDS) as trades:
+        for number, frame in enumerate(chunks):
+            # Like the in-memory run, nothing trades on the file's first bar
+            backtest(frame, 1 if number == 0 else 0, state, trades)
+    return state.get('balance', 10000)
+
+
+def run_mean_reversion(file_path, output_file='mean_reversion_trades.csv', chunksize=100_000,
+                       stop_loss_pips=10, take_profit_pips=10):
+    """
+    meanReversion's backtest over a CSV read in chunks.
+
+    Returns:
+        float: Final balance, equal to the in-memory run's.
+    """
+    # Same indicators as meanReversion.calculate_indicators
+    sma50, rsi = StreamingSMA(50), StreamingRSI(14)
+
+    def backtest(frame, start, state, trades):
+        close = frame['Close'].to_numpy(dtype=float)
+        meanReversion.run_backtest(close, stream(sma50, close), stream(rsi, close), stop_loss_pips,
+                                   take_profit_pips, start=start, state=state, trades=trades, dates=frame.index)
+
+    chunks = read_chunks(file_path, chunksize, usecols=['Date', 'Close'], parse_dates=['Date'], index_col='Date')
+    return _run_paired(chunks, output_file, backtest)
+
+
+def run_range(file_path, output_file='low_risk_trades.csv', chunksize=100_000, bollinger_window=20, atr_period=14,
+              rsi_period=14, **strategy_kwargs):
+    """
+    rangeTrading's backtest over a CSV read in chunks.
+
+    Returns:
+        float: Final balance, equal to the in-memory run's.
+    """
+    # Same indicators as rangeTrading.calculate_indicators
+    atr, bands, rsi = StreamingATR(atr_period), StreamingBollinger(bollinger_window, 2), StreamingRSI(rsi_period)
+
+    def backtest(frame, start, state, trades):
+        high, low, close = (frame[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+        _, upper_band, lower_band, _ = stream(bands, close)
+        rangeTrading.run_backtest(close, lower_band, upper_band, stream(rsi, close), stream(atr, high, low, close),
+                                  start=start, state=state, trades=trades, dates=frame.index, **strategy_kwargs)
+
+    chunks = read_chunks(file_path, chunksize, usecols=['Date', 'High', 'Low', 'Close'], parse_dates=['Date'],
+                         index_col='Date')
+    return _run_paired(chunks, output_file, backtest)
+
+
+def run_ema_adx(file_path, output_file='isthisreal.csv', chunksize=100_000, **engine_kwargs):
+    """
+    ema_adx_algo's backtest over a CSV read in chunks, through the streaming EmaAdxEngine.
+
+    Returns:
+        float: Total profit/loss, equal to the in-memory run's.
+    """
+    # Same rows skipped as ema_adx_algo.load_data; the engine carries all
+    # indicator state from chunk to chunk
+    chunks = read_chunks(file_path, chunksize, usecols=['High', 'Low', 'Close'], skiprows=(1, 21))
+    bars = (
+        bar for chunk in chunks
+        for bar in zip(chunk.index, chunk['High'].tolist(), chunk['Low'].tolist(), chunk['Close'].tolist())
+    )
+    with TradeWriter(output_file, EMA_ADX_FIELDS) as trade_log:
+        engine = run_bars(EmaAdxEngine(trade_log=trade_log, **engine_kwargs), bars)
+        engine.log_open_trade()
+    return engine.total_profit_loss
+
+
+STRATEGIES = {
+    'mean_reversion': run_mean_reversion,
+    'range': run_range,
+    'ema_adx': run_ema_adx,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest a strategy over a large CSV in chunks.')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES))
+    parser.add_argument('file_path')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    result = STRATEGIES[args.strategy](args.file_path, args.output, args.chunksize)
+    if args.strategy == 'ema_adx':
+        print(f"Total Profit/Loss: ${result:.2f}")
+    else:
+        print(f"Final Balance: ${result}")
+        print(f"Net Profit: ${result - 10000}")
+    print(f"Trades saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,112 +1,111 @@
-import pandas as pd
 import numpy as np
 
+from asset_store import AssetStore
+from barriers import BarrierIndex, first_barrier_hits
+from indicators import atr
+from instrumentation import span
+from ledger import TradeLedger
+from trade_writer import TradeWriter
+
+# Define risk-to-reward ratio (1:3)
+risk_to_reward_ratio = 5
+
+
 # Load data
-xauusd_data = pd.read_csv('XAUUSD_D1.csv', parse_dates=True, index_col='Date')
-dxy_data = pd.read_csv('Download Data - INDEX_US_IFUS_DXY (1).csv', parse_dates=True, index_col='Date')
+def load_data(xau_path='XAUUSD_D1.csv', dxy_path='Download Data - INDEX_US_IFUS_DXY (1).csv', store=None):
+    store = store or AssetStore()
+    store.load('XAU', xau_path)
+    store.load('DXY', dxy_path)
 
-# Ensure both datasets are aligned on dates
-data = pd.merge(xauusd_data, dxy_data, left_index=True, right_index=True, suffixes=('_XAU', '_DXY'))
+    # Ensure both datasets are aligned on dates (only dates both have, like an
+    # inner merge; how='XAU' would keep every XAU bar with DXY as of that date)
+    return store.align(['XAU', 'DXY'], how='inner')
 
-# Calculate ATR manually
-high = data['High_XAU']
-low = data['Low_XAU']
-close = data['Close_XAU']
 
-# True range is the maximum of (High - Low), (High - Previous Close), (Previous Close - Low)
-tr = pd.DataFrame({
-    'High-Low': high - low,
-    'High-Prev Close': abs(high - close.shift(1)),
-    'Low-Prev Close': abs(low - close.shift(1))
-})
+def calculate_indicators(data, risk_to_reward_ratio=risk_to_reward_ratio):
+    # Calculate ATR (14-period moving average of the true range against the previous close)
+    data['ATR'] = atr(data['High_XAU'], data['Low_XAU'], data['Close_XAU'], 14)
 
-# Calculate ATR (14-period moving average of true range)
-data['ATR'] = tr.max(axis=1).rolling(window=14).mean()
+    # Define entry conditions for XAU/USD based on Dollar Index (DXY)
+    data['Long_Entry'] = (data['Close_DXY'] < data['Low_DXY'].shift(1))  # DXY closes below support
+    data['Short_Entry'] = (data['Close_DXY'] > data['High_DXY'].shift(1))  # DXY closes above resistance
 
-# Define entry conditions for XAU/USD based on Dollar Index (DXY)
-data['Long_Entry'] = (data['Close_DXY'] < data['Low_DXY'].shift(1))  # DXY closes below support
-data['Short_Entry'] = (data['Close_DXY'] > data['High_DXY'].shift(1))  # DXY closes above resistance
+    # Calculate stop loss and take profit dynamically based on ATR
+    data['Stop_Loss_Long'] = data['Close_XAU'] - data['ATR']
+    data['Take_Profit_Long'] = data['Close_XAU'] + (data['ATR'] * risk_to_reward_ratio)
+
+    data['Stop_Loss_Short'] = data['Close_XAU'] + data['ATR']
+    data['Take_Profit_Short'] = data['Close_XAU'] - (data['ATR'] * risk_to_reward_ratio)
+    return data
+
+
+# Trade rows produced by simulate_trades
+def trade_fields(date_dtype):
+    return [
+        ('Trade Type', 'U5'), ('Entry Date', date_dtype), ('Entry Price', 'f8'), ('Stop Loss', 'f8'),
+        ('Take Profit', 'f8'), ('Exit Date', date_dtype), ('Exit Price', 'f8'), ('Profit/Loss (PIP)', 'f8'),
+    ]
+
+
+# Trades are added to `trades` (a TradeLedger or TradeWriter) if given
+def simulate_trades(data, trades=None):
+    # Simulate trades: each entry exits on the first later close that touches its
+    # stop loss or take profit (stop loss wins if both are touched on the same bar).
+    # The first bar is never an entry; long entries take priority over short ones.
+    close_xau = data['Close_XAU'].to_numpy(dtype=float)
+    long_entry = data['Long_Entry'].to_numpy()
+    short_entry = data['Short_Entry'].to_numpy()
+    entries = np.flatnonzero(long_entry | short_entry)
+    entries = entries[entries >= 1]
+    is_long = long_entry[entries]
+
+    entry_price = close_xau[entries]
+    stop_loss = np.where(
+        is_long, data['Stop_Loss_Long'].to_numpy()[entries], data['Stop_Loss_Short'].to_numpy()[entries]
+    )
+    take_profit = np.where(
+        is_long, data['Take_Profit_Long'].to_numpy()[entries], data['Take_Profit_Short'].to_numpy()[entries]
+    )
+
+    exit_idx, stop_hit = first_barrier_hits(
+        BarrierIndex(close_xau), entries + 1, stop_loss, take_profit, np.where(is_long, 1, -1)
+    )
+
+    # Trades that never reach a barrier are not recorded
+    closed = exit_idx < len(data)
+    entries, is_long, exit_idx, stop_hit = entries[closed], is_long[closed], exit_idx[closed], stop_hit[closed]
+    entry_price, stop_loss, take_profit = entry_price[closed], stop_loss[closed], take_profit[closed]
+    exit_level = np.where(stop_hit, stop_loss, take_profit)
+
+    trade_details = trades
+    if trade_details is None:
+        trade_details = TradeLedger(trade_fields(data.index.dtype), capacity=len(entries))
+    trade_details.extend({
+        'Trade Type': np.where(is_long, 'Long', 'Short'),
+        'Entry Date': data.index[entries],
+        'Entry Price': entry_price,
+        'Stop Loss': stop_loss,
+        'Take Profit': take_profit,
+        'Exit Date': data.index[exit_idx],
+        'Exit Price': close_xau[exit_idx],
+        'Profit/Loss (PIP)': np.where(is_long, exit_level - entry_price, entry_price - exit_level) * 1000,
+    })
+    return trade_details
+
+
+def main():
+    with span('load'):
+        data = load_data()
+    with span('indicators'):
+        data = calculate_indicators(data)
+    # Save trade details to CSV, written in batches as they are added
+    with span('simulate'), TradeWriter('trade_results.csv', trade_fields(data.index.dtype)) as trade_details:
+        simulate_trades(data, trades=trade_details)
+
+    # Output results
+    print(f'Total Trades: {len(trade_details)}')
+    print(f'Trades saved to "trade_results.csv".')
 
-# Define risk-to-reward ratio (1:3)
-risk_to_reward_ratio = 5
 
-# Calculate stop loss and take profit dynamically based on ATR
-data['Stop_Loss_Long'] = data['Close_XAU'] - data['ATR']
-data['Take_Profit_Long'] = data['Close_XAU'] + (data['ATR'] * risk_to_reward_ratio)
-
-data['Stop_Loss_Short'] = data['Close_XAU'] + data['ATR']
-data['Take_Profit_Short'] = data['Close_XAU'] - (data['ATR'] * risk_to_reward_ratio)
-
-# Prepare a list to store trade details
-trade_details = []
-
-# Simulate trades
-for i in range(1, len(data)):
-    if data['Long_Entry'].iloc[i]:
-        # Long trade: Entry at the close of the next candle
-        entry_price = data['Close_XAU'].iloc[i]
-        stop_loss = data['Stop_Loss_Long'].iloc[i]
-        take_profit = data['Take_Profit_Long'].iloc[i]
-        for j in range(i + 1, len(data)):
-            if data['Close_XAU'].iloc[j] <= stop_loss:  # Stop loss hit
-                trade_details.append({
-                    'Trade Type': 'Long',
-                    'Entry Date': data.index[i],
-                    'Entry Price': entry_price,
-                    'Stop Loss': stop_loss,
-                    'Take Profit': take_profit,
-                    'Exit Date': data.index[j],
-                    'Exit Price': data['Close_XAU'].iloc[j],
-                    'Profit/Loss (PIP)': (stop_loss - entry_price) * 1000
-                })
-                break
-            elif data['Close_XAU'].iloc[j] >= take_profit:  # Take profit hit
-                trade_details.append({
-                    'Trade Type': 'Long',
-                    'Entry Date': data.index[i],
-                    'Entry Price': entry_price,
-                    'Stop Loss': stop_loss,
-                    'Take Profit': take_profit,
-                    'Exit Date': data.index[j],
-                    'Exit Price': data['Close_XAU'].iloc[j],
-                    'Profit/Loss (PIP)': (take_profit - entry_price) * 1000
-                })
-                break
-    elif data['Short_Entry'].iloc[i]:
-        # Short trade: Entry at the close of the next candle
-        entry_price = data['Close_XAU'].iloc[i]
-        stop_loss = data['Stop_Loss_Short'].iloc[i]
-        take_profit = data['Take_Profit_Short'].iloc[i]
-        for j in range(i + 1, len(data)):
-            if data['Close_XAU'].iloc[j] >= stop_loss:  # Stop loss hit
-                trade_details.append({
-                    'Trade Type': 'Short',
-                    'Entry Date': data.index[i],
-                    'Entry Price': entry_price,
-                    'Stop Loss': stop_loss,
-                    'Take Profit': take_profit,
-                    'Exit Date': data.index[j],
-                    'Exit Price': data['Close_XAU'].iloc[j],
-                    'Profit/Loss (PIP)': (entry_price - stop_loss) * 1000
-                })
-                break
-            elif data['Close_XAU'].iloc[j] <= take_profit:  # Take profit hit
-                trade_details.append({
-                    'Trade Type': 'Short',
-                    'Entry Date': data.index[i],
-                    'Entry Price': entry_price,
-                    'Stop Loss': stop_loss,
-                    'Take Profit': take_profit,
-                    'Exit Date': data.index[j],
-                    'Exit Price': data['Close_XAU'].iloc[j],
-                    'Profit/Loss (PIP)': (entry_price - take_profit) * 1000
-                })
-                break
-
-# Save trade details to CSV
-trade_df = pd.DataFrame(trade_details)
-trade_df.to_csv('trade_results.csv', index=False)
-
-# Output results
-print(f'Total Trades: {len(trade_details)}')
-print(f'Trades saved to "trade_results.csv".')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Correlation and lead-lag scanner over a universe of tickers.
+#
+# Every pair's correlation at every lag comes out of matrix products over a
+# (days x tickers) returns matrix: with the columns standardised, the
+# correlations between the leader returns k days earlier and the follower
+# returns today are one Z_lead.T @ Z_follow product. scan() works through
+# blocks of leader columns so memory stays at block x tickers per lag however
+# large the universe is, and keeps only the strongest pairs of each block.
+#
+# RollingCrossCorrelation keeps the same statistics over a sliding window as
+# running sums. Each new day adds one outer product per lag and removes the
+# one that fell out of the window, so a day's update for 500 tickers and five
+# lags takes milliseconds instead of a full rescan.
+
+RANK_COLUMNS = ['leader', 'follower', 'lag', 'correlation']
+
+
+def returns_matrix(closes, min_coverage=0.9):
+    """
+    Daily log returns from a frame of closes, one column per ticker.
+
+    Tickers with prices on fewer than `min_coverage` of the dates are dropped;
+    remaining gaps count as zero returns.
+
+    Returns:
+        pd.DataFrame: Returns indexed by date (the first date is dropped).
+    """
+    closes = closes.loc[:, closes.notna().mean() >= min_coverage].sort_index()
+    returns = np.log(closes.astype(float)).diff().iloc[1:]
+    return returns.fillna(0.0)
+
+
+def closes_from_cache(cache, tickers, start, end, interval='1d'):
+    """Close prices for `tickers` from a price_cache.PriceCache, outer-joined on date."""
+    closes = {}
+    for ticker in tickers:
+        try:
+            history = cache.get(ticker, start, end, interval)
+        except Exception as e:
+            print(f"Skipping {ticker}: {e}")
+            continue
+        if len(history):
+            closes[ticker] = history['Close']
+    return pd.DataFrame(closes)
+
+
+def _standardize(values):
+    centered = values - values.mean(axis=0)
+    scale = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(scale > 0, centered / scale, 0.0)
+
+
+def _top(correlation, count, min_abs):
+    # Flat positions of the `count` largest |correlation| values above
+    # min_abs; NaNs (masked pairs, tickers that did not move) never qualify
+    strength = np.abs(correlation).ravel()
+    candidates = np.flatnonzero(strength >= min_abs)
+    if len(candidates) > count:
+        candidates = candidates[np.argpartition(strength[candidates], -count)[-count:]]
+    return candidates
+
+
+def rank_pairs(correlations, lags, tickers, top=50, min_abs=0.0):
+    """
+    Strongest pairs from square correlation matrices, one per lag.
+
+    A ticker is never paired with itself. At lag 0 each unordered pair is
+    listed once; at other lags (leader, follower) order matters.
+
+    Returns:
+        pd.DataFrame: RANK_COLUMNS, sorted by decreasing |correlation|.
+    """
+    rows = []
+    for lag, correlation in zip(lags, correlations):
+        # Upper triangle at lag 0, everything off the diagonal at other lags
+        keep = np.triu(np.ones(correlation.shape, dtype=bool), 1)
+        correlation = np.where(keep if lag == 0 else keep | keep.T, correlation, np.nan)
+        for flat in _top(correlation, top, min_abs):
+            leader, follower = divmod(int(flat), correlation.shape[1])
+            rows.append((tickers[leader], tickers[follower], lag, float(correlation[leader, follower])))
+    return _ranked(rows, top)
+
+
+def _ranked(rows, top):
+    ranked = pd.DataFrame(rows, columns=RANK_COLUMNS)
+    order = np.argsort(-ranked['correlation'].abs().to_numpy(), kind='stable')
+    return ranked.iloc[order[:top]].reset_index(drop=True)
+
+
+def scan(returns, lags=(0, 1, 2, 3, 5), top=50, min_abs=0.0, block=256):
+    """
+    Rank every (leader, follower, lag) by correlation over the whole sample.
+
+    Args:
+        returns (pd.DataFrame): Returns matrix, e.g. from returns_matrix.
+        lags (tuple): Days the leader's return is shifted back; 0 is plain correlation.
+        top (int): Pairs to return.
+        min_abs (float): Ignore correlations weaker than this.
+        block (int): Leader tickers per matrix product.
+
+    Returns:
+        pd.DataFrame: RANK_COLUMNS, sorted by decreasing |correlation|.
+    """
+    values = returns.to_numpy(dtype=float)
+    tickers = list(returns.columns)
+    days, n = values.shape
+    rows = []
+    for lag in lags:
+        if days - lag < 3:
+            continue
+        lead = _standardize(values[:days - lag])
+        follow = _standardize(values[lag:])
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            correlation = lead[:, start:stop].T @ follow
+            # No self-pairs; at lag 0 the upper triangle only, so each
+            # unordered pair is listed once
+            leaders, followers = np.arange(start, stop)[:, None], np.arange(n)[None, :]
+            correlation = np.where(leaders < followers if lag == 0 else leaders != followers, correlation, np.nan)
+            for flat in _top(correlation, top, min_abs):
+                leader, follower = divmod(int(flat), n)
+                rows.append((tickers[start + leader], tickers[follower], lag, float(correlation[leader, follower])))
+    return _ranked(rows, top)
+
+
+class RollingCrossCorrelation:
+    """
+    Lagged correlations of every ticker pair over a sliding window of days.
+
+    Running sums of returns, squared returns and lagged cross products are
+    adjusted as each day arrives and another leaves the window. Call refresh()
+    now and then on long runs to recompute them and clear rounding drift.
+
+    Args:
+        tickers (list): Column order of the rows passed to update().
+        window (int): Days of (leader, follower) return pairs per correlation.
+        lags (tuple): Leader lags in days.
+    """
+
+    def __init__(self, tickers, window=60, lags=(0, 1, 2, 3, 5)):
+        self.tickers = list(tickers)
+        self.window = window
+        self.lags = tuple(lags)
+        n = len(self.tickers)
+        self.history = np.zeros((window + max(self.lags) + 1, n))
+        self.days = 0
+        self.sum = np.zeros(n)
+        self.sum_sq = np.zeros(n)
+        self.lead_sum = np.zeros((len(self.lags), n))
+        self.lead_sum_sq = np.zeros((len(self.lags), n))
+        self.cross = np.zeros((len(self.lags), n, n))
+
+    def _row(self, age):
+        # Returns from `age` days before the latest one
+        return self.history[(self.days - 1 - age) % len(self.history)]
+
+    def _add(self, age, sign):
+        # Add (sign=1) or remove (sign=-1) the pairs whose follower day is `age` days ago
+        follow = self._row(age)
+        self.sum += sign * follow
+        self.sum_sq += sign * follow ** 2
+        for k, lag in enumerate(self.lags):
+            lead = self._row(age + lag)
+            self.lead_sum[k] += sign * lead
+            self.lead_sum_sq[k] += sign * lead ** 2
+            self.cross[k] += sign * np.outer(lead, follow)
+
+    def update(self, returns):
+        """Add one day of returns (NaN counts as zero), dropping the oldest day beyond the window."""
+        self.history[self.days % len(self.history)] = np.nan_to_num(np.asarray(returns, dtype=float), nan=0.0)
+        self.days += 1
+        # Follower days start once the longest lag has a leader day
+        if self.days > max(self.lags):
+            self._add(0, 1)
+            if self.days - max(self.lags) > self.window:
+                self._add(self.window, -1)
+
+    @property
+    def pairs(self):
+        """Number of (leader, follower) day pairs behind each correlation."""
+        return min(max(self.days - max(self.lags), 0), self.window)
+
+    def refresh(self):
+        """Recompute the running sums from the days in the window."""
+        count = self.pairs
+        for values in (self.sum, self.sum_sq, self.lead_sum, self.lead_sum_sq, self.cross):
+            values[...] = 0.0
+        for age in range(count):
+            self._add(age, 1)
+
+    def correlations(self):
+        """
+        Current correlation matrices.
+
+        Returns:
+            np.ndarray: (lags, leaders, followers); NaN where a ticker did not move.
+        """
+        m = self.pairs
+        covariance = m * self.cross - self.lead_sum[:, :, None] * self.sum[None, None, :]
+        lead_var = m * self.lead_sum_sq - self.lead_sum ** 2
+        follow_var = m * self.sum_sq - self.sum ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.sqrt(np.clip(lead_var, 0, None))[:, :, None] * np.sqrt(np.clip(follow_var, 0, None))[None, None, :]
+            return np.where(scale > 0, covariance / scale, np.nan)
+
+    def ranked(self, top=50, min_abs=0.0):
+        """Strongest pairs in the current window (see rank_pairs)."""
+        return rank_pairs(self.correlations(), self.lags, self.tickers, top, min_abs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank ticker pairs by correlation and lead-lag correlation.')
+    parser.add_argument('companies', help='CSV with a Symbol column, e.g. sp500_companies.csv')
+    parser.add_argument('--cache', default='.price_cache', help='PriceCache directory')
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--lags', type=int, nargs='+', default=[0, 1, 2, 3, 5])
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--output', default='correlation_pairs.csv')
+    args = parser.parse_args()
+
+    from price_cache import PriceCache
+
+    tickers = pd.read_csv(args.companies)['Symbol'].dropna().tolist()
+    end = datetime.today()
+    closes = closes_from_cache(PriceCache(args.cache), tickers, end - timedelta(days=args.days), end)
+    returns = returns_matrix(closes)
+    ranked = scan(returns, args.lags, args.top)
+    ranked.to_csv(args.output, index=False)
+    print(ranked.to_string())
+    print(f"Scanned {returns.shape[1]} tickers over {len(returns)} days; pairs saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,12 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import time
 
-def fetch_and_save_data(ticker, start_date, end_date, interval='1d', retry_limit=3, delay=2):
+from data_loader import load_csv
+from instrumentation import span
+from price_cache import PriceCache
+from sp500_fetch import retry_with_backoff
+
+def fetch_and_save_data(ticker, start_date, end_date, interval='1d', retry_limit=3, delay=2, cache_dir='.price_cache'):
     """
     Fetch historical stock data from Yahoo Finance with rate limiting and retries, then save to CSV.
 	Covered calll strategy, need to hold 100 shares of stock to mitigate risks
@@ -13,44 +17,93 @@ def fetch_and_save_data(ticker, start_date, end_date, interval='1d', retry_limit
         end_date (str): End date in 'YYYY-MM-DD' format.
         interval (str): Data interval ('1d', '1wk', '1mo').
         retry_limit (int): Number of retry attempts in case of failure.
-        delay (int): Delay in seconds between retries.
+        delay (int): Delay in seconds before the first retry, doubled after each failure.
+        cache_dir (str): Price cache directory; only bars missing from it are downloaded.
 
     Returns:
         None: Data is saved to a CSV file instead of returned.
     """
-    for attempt in range(retry_limit):
-        try:
-            print(f"Fetching data for {ticker} (Attempt {attempt + 1})...")
-            data = yf.download(ticker, start=start_date, end=end_date, interval=interval)
-            if data.empty:
-                print(f"No data returned for {ticker}.")
-                return
-            print(f"Data fetched successfully for {ticker}.")
-            data.to_csv(f"{ticker}_data.csv")
-            return
-        except Exception as e:
-            print(f"Error fetching data: {e}")
-            if attempt < retry_limit - 1:
-                print(f"Retrying in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                print("All retries failed.")
+    import yfinance as yf
 
-def backtest_options_strategy_from_csv(file_path, strike_price, option_type='put', premium=1.0):
+    def download(ticker, start, end, interval):
+        print(f"Fetching data for {ticker} from {start:%Y-%m-%d} to {end:%Y-%m-%d}...")
+        return retry_with_backoff(
+            lambda: yf.download(ticker, start=start, end=end, interval=interval),
+            retry_limit=retry_limit, delay=delay, on_retry=report_retry
+        )
+
+    def report_retry(attempt, error, wait):
+        print(f"Error fetching data: {error}")
+        print(f"Retrying in {wait:.1f} seconds (attempt {attempt + 1} of {retry_limit})...")
+
+    try:
+        data = PriceCache(cache_dir, downloader=download).get(ticker, start_date, end_date, interval)
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        print("All retries failed.")
+        return
+    if data.empty:
+        print(f"No data returned for {ticker}.")
+        return
+    print(f"Data fetched successfully for {ticker}.")
+    data.to_csv(f"{ticker}_data.csv")
+
+def option_pnl_surface(close, strikes, premiums, cadences=(1,), option_type='put'):
     """
-    Backtest a basic options strategy using data from a CSV file.
+    P&L of selling one option per expiry for every strike, premium and expiry cadence.
+
+    An option with cadence k expires on every k-th bar (cadence 1 is every bar,
+    as in backtest_options_strategy_from_csv) and pays premium plus its
+    intrinsic value at the close. Closes are sorted once per cadence, so the
+    intrinsic value summed over all expiries comes from a cumulative sum and a
+    binary search per strike instead of a pass over the data.
 
     Args:
-        file_path (str): Path to the CSV file containing stock data.
-        strike_price (float): Strike price of the option.
+        close (array-like): Closing prices.
+        strikes (array-like): Strike prices.
+        premiums (array-like): Premiums collected per option.
+        cadences (array-like): Bars between expiries.
         option_type (str): Type of the option ('call' or 'put').
-        premium (float): Premium collected from selling the option.
 
     Returns:
-        float: Total profit/loss from the strategy.
+        np.ndarray: Total profit/loss with shape (len(strikes), len(premiums), len(cadences)).
+    """
+    if option_type not in ('call', 'put'):
+        raise ValueError("Invalid option type. Choose 'call' or 'put'.")
+    close = np.asarray(close, dtype=float)
+    strikes = np.asarray(strikes, dtype=float)
+    premiums = np.asarray(premiums, dtype=float)
+
+    intrinsic = np.empty((len(strikes), len(cadences)))
+    expiries = np.empty(len(cadences))
+    for j, cadence in enumerate(cadences):
+        expiry_close = close[cadence - 1::cadence]
+        # Every expiry collects the premium, but a missing (NaN) close adds no
+        # intrinsic value, so only valid closes are sorted and summed
+        expiries[j] = len(expiry_close)
+        expiry_close = np.sort(expiry_close[~np.isnan(expiry_close)])
+        cumulative = np.concatenate(([0.0], np.cumsum(expiry_close)))
+        n = len(expiry_close)
+        if option_type == 'put':
+            # Closes below the strike each add strike - close
+            below = np.searchsorted(expiry_close, strikes, side='left')
+            intrinsic[:, j] = below * strikes - cumulative[below]
+        else:
+            # Closes above the strike each add close - strike
+            at_or_below = np.searchsorted(expiry_close, strikes, side='right')
+            intrinsic[:, j] = (cumulative[n] - cumulative[at_or_below]) - (n - at_or_below) * strikes
+
+    return intrinsic[:, None, :] + premiums[None, :, None] * expiries[None, None, :]
+
+def load_close(file_path):
+    """
+    Load closing prices from a CSV saved by fetch_and_save_data.
+
+    Returns:
+        pd.Series: Close indexed by date, or None when the CSV has no date column.
     """
     # Check for the correct date column name in the CSV
-    data = pd.read_csv(file_path)
+    data = load_csv(file_path)
     # yfinance might use 'Date' or 'Datetime' as the column name for dates
     date_column = 'Date' if 'Date' in data.columns else 'Datetime' if 'Datetime' in data.columns else None
     
@@ -60,43 +113,59 @@ def backtest_options_strategy_from_csv(file_path, strike_price, option_type='put
     
     data[date_column] = pd.to_datetime(data[date_column])
     data.set_index(date_column, inplace=True)
-    
-    total_pnl = 0
-    for _, row in data.iterrows():
-        close_price = row['Close']  # Extract close price as a scalar value
+    return data['Close']
 
-        if option_type == 'put':
-            if close_price < strike_price:
-                pnl = premium + (strike_price - close_price)
-            else:
-                pnl = premium
-        elif option_type == 'call':
-            if close_price > strike_price:
-                pnl = premium + (close_price - strike_price)
-            else:
-                pnl = premium
-        else:
-            raise ValueError("Invalid option type. Choose 'call' or 'put'.")
-        
-        total_pnl += pnl
-
-    return total_pnl
-
-# Settings
-ticker = 'XRX'
-start_date = '2023-01-01'
-end_date = '2025-01-01'
-strike_price = 0.5  
-premium = 1.0  
-
-# Fetch and save data
-#fetch_and_save_data(ticker, start_date, end_date)
-
-# Run backtest using the CSV file
-csv_file_path = f"{ticker}_data.csv"
-if not pd.read_csv(csv_file_path).empty:
-    pnl = backtest_options_strategy_from_csv(csv_file_path, strike_price, option_type='put', premium=premium)
-    if pnl is not None:
-        print(f"Total Profit/Loss from the strategy: ${pnl:.2f}")
-else:
-    print("No data available in the CSV file.")
\ No newline at end of file
+def backtest_options_strategy_from_csv(file_path, strike_price, option_type='put', premium=1.0):
+    """
+    Backtest a basic options strategy using data from a CSV file.
+
+    Args:
+        file_path (str): Path to the CSV file containing stock data.
+        strike_price (float): Strike price of the option.
+        option_type (str): Type of the option ('call' or 'put').
+        premium (float): Premium collected from selling the option.
+
+    Returns:
+        float: Total profit/loss from the strategy.
+    """
+    with span('load'):
+        close = load_close(file_path)
+    if close is None:
+        return None
+    with span('simulate'):
+        return float(option_pnl_surface(close, [strike_price], [premium], option_type=option_type)[0, 0, 0])
+
+def backtest_options_grid_from_csv(file_path, strikes, premiums, cadences=(1,), option_type='put'):
+    """
+    Backtest every strike, premium and expiry cadence combination from one CSV read.
+
+    Returns:
+        np.ndarray: P&L surface from option_pnl_surface, or None when the CSV has no date column.
+    """
+    close = load_close(file_path)
+    if close is None:
+        return None
+    return option_pnl_surface(close, strikes, premiums, cadences, option_type)
+
+def main():
+    # Settings
+    ticker = 'XRX'
+    start_date = '2023-01-01'
+    end_date = '2025-01-01'
+    strike_price = 0.5
+    premium = 1.0
+
+    # Fetch and save data
+    #fetch_and_save_data(ticker, start_date, end_date)
+
+    # Run backtest using the CSV file
+    csv_file_path = f"{ticker}_data.csv"
+    if not load_csv(csv_file_path).empty:
+        pnl = backtest_options_strategy_from_csv(csv_file_path, strike_price, option_type='put', premium=premium)
+        if pnl is not None:
+            print(f"Total Profit/Loss from the strategy: ${pnl:.2f}")
+    else:
+        print("No data available in the CSV file.")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# CSV loading with a columnar binary cache.
+#
+# The first load of a CSV parses it (including dates) with pandas and stores
+# each column as a .npy file. Later loads open those files memory-mapped, so
+# no text or date parsing happens and the column data is not copied until it
+# is modified. A cache entry is keyed on the source path and the load options,
+# and is rebuilt automatically when the source file's mtime or size changes.
+
+CACHE_VERSION = 1
+
+# Override the cache location with this environment variable; by default the
+# cache lives in a .csv_cache directory next to each source file
+CACHE_DIR_ENV = 'CSV_CACHE_DIR'
+
+
+def _cache_root(file_path, cache_dir):
+    if cache_dir is None:
+        cache_dir = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.dirname(file_path), '.csv_cache')
+    return cache_dir
+
+
+def _cache_key(file_path, parse_dates, read_csv_kwargs):
+    options = json.dumps([file_path, list(parse_dates), sorted((k, repr(v)) for k, v in read_csv_kwargs.items())])
+    return hashlib.sha1(options.encode()).hexdigest()
+
+
+def _source_stamp(file_path):
+    stat = os.stat(file_path)
+    return {'source': file_path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'version': CACHE_VERSION}
+
+
+def _write_cache(df, entry, stamp):
+    tmp = f'{entry}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        dtype = series.dtype
+        column = {'name': name, 'dtype': str(dtype), 'kind': 'array'}
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            # Stored as UTC wall time, localised again on load
+            values = series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+            column.update(kind='datetime_tz', tz=str(dtype.tz))
+        elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+            values = series.to_numpy()
+        else:
+            # Text columns become fixed-width unicode plus a missing-value mask
+            missing = series.isna().to_numpy()
+            values = np.asarray(series.astype(object).where(~missing, '').to_numpy(), dtype=str)
+            np.save(os.path.join(tmp, f'{i}.mask.npy'), missing)
+            column['kind'] = 'text'
+        np.save(os.path.join(tmp, f'{i}.npy'), values)
+        columns.append(column)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({**stamp, 'columns': columns, 'length': len(df)}, f)
+    shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # Another process published the same entry first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _load_column(path):
+    # mmap_mode='c' maps the file copy-on-write: reads are zero-copy and writes
+    # stay private to this process. Empty arrays cannot be mapped.
+    try:
+        return np.load(path, mmap_mode='c')
+    except ValueError:
+        return np.load(path)
+
+
+def _read_cache(entry, stamp):
+    try:
+        with open(os.path.join(entry, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if any(meta.get(key) != value for key, value in stamp.items()):
+        return None
+
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        values = _load_column(os.path.join(entry, f'{i}.npy'))
+        if column['kind'] == 'datetime_tz':
+            values = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(column['tz'])
+        elif column['kind'] == 'text':
+            missing = np.load(os.path.join(entry, f'{i}.mask.npy'))
+            values = pd.array(np.where(missing, None, values.astype(object)), dtype=column['dtype'])
+        data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_csv(file_path, parse_dates=(), index_col=None, cache_dir=None, **read_csv_kwargs):
+    """
+    Load a CSV through the columnar cache.
+
+    Args:
+        file_path (str): Path to the CSV file.
+        parse_dates (list): Columns converted with pd.to_datetime before caching.
+        index_col (str): Column to set as the index after loading.
+        cache_dir (str): Cache directory. Defaults to $CSV_CACHE_DIR or a
+            .csv_cache directory next to the CSV.
+        **read_csv_kwargs: Passed to pd.read_csv when the cache is (re)built.
+
+    Returns:
+        pd.DataFrame: The loaded data.
+    """
+    file_path = os.path.abspath(file_path)
+    parse_dates = list(parse_dates)
+    stamp = _source_stamp(file_path)
+    entry = os.path.join(
+        _cache_root(file_path, cache_dir), _cache_key(file_path, parse_dates, read_csv_kwargs)
+    )
+
+    df = _read_cache(entry, stamp)
+    if df is None:
+        df = pd.read_csv(file_path, **read_csv_kwargs)
+        for column in parse_dates:
+            df[column] = pd.to_datetime(df[column])
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            _write_cache(df, entry, stamp)
+        except OSError as e:
+            print(f"Could not cache {file_path}: {e}")
+
+    if index_col is not None:
+        df = df.set_index(index_col)
+    return df
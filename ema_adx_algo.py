@@ -1,102 +1,129 @@
 import pandas as pd
 import numpy as np
 
-# Fetch historical data (1-hour timeframe for GBP/USD)
-file_path = "USDCAD_H1_mt.csv"
-data = pd.read_csv(file_path, skiprows=(1,21))
+from barriers import first_touch
+from data_loader import load_csv
+from events import crossings, next_event, where
+from indicators import directional_indicators, ema
+from instrumentation import span
+from ledger import TradeLedger
+from trade_writer import TradeWriter
 
-# Calculate EMA (Exponential Moving Average)
-data['EMA9'] = data['Close'].ewm(span=9, adjust=False).mean()
-data['EMA21'] = data['Close'].ewm(span=21, adjust=False).mean()
+# Fetch historical data (1-hour timeframe for GBP/USD)
+def load_data(file_path):
+    return load_csv(file_path, skiprows=(1,21))
 
 # Calculate ADX (Average Directional Index)
 def calculate_adx(data, period=14):
-    # Calculate True Range (TR)
-    data['H-L'] = data['High'] - data['Low']
-    data['H-PClose'] = abs(data['High'] - data['Close'].shift(1))
-    data['L-PClose'] = abs(data['Low'] - data['Close'].shift(1))
-    data['TR'] = data[['H-L', 'H-PClose', 'L-PClose']].max(axis=1)
-    
-    # Calculate +DM and -DM
-    data['+DM'] = np.where(data['High'] > data['High'].shift(1), data['High'] - data['High'].shift(1), 0)
-    data['-DM'] = np.where(data['Low'] < data['Low'].shift(1), data['Low'].shift(1) - data['Low'], 0)
-
-    # Smooth TR, +DM, -DM over the period
-    data['TR_smooth'] = data['TR'].rolling(window=period).sum()
-    data['+DM_smooth'] = data['+DM'].rolling(window=period).sum()
-    data['-DM_smooth'] = data['-DM'].rolling(window=period).sum()
-    
-    # Calculate +DI and -DI
-    data['+DI'] = 100 * (data['+DM_smooth'] / data['TR_smooth'])
-    data['-DI'] = 100 * (data['-DM_smooth'] / data['TR_smooth'])
+    # +DI and -DI from TR, +DM and -DM summed over the period
+    data['+DI'], data['-DI'] = directional_indicators(data['High'], data['Low'], data['Close'], period)
     
     # Calculate ADX (Average Directional Index)
     data['ADX'] = 100 * (abs(data['+DI'] - data['-DI']) / (data['+DI'] + data['-DI']))
 
-# Calculate ADX
-calculate_adx(data)
+def calculate_indicators(data):
+    # Calculate EMA (Exponential Moving Average)
+    data['EMA9'] = ema(data['Close'], 9)
+    data['EMA21'] = ema(data['Close'], 21)
+
+    # Calculate ADX
+    calculate_adx(data)
+    return data
 
 # Strategy: EMA Crossover with ADX Filter
 # Conditions for Buy: EMA9 > EMA21 and ADX > 25
 # Conditions for Sell: EMA9 < EMA21 and ADX > 25
 
-# Simulate trades
-trade_details = []
-in_position = False
-entry_price = 0
-stop_loss_pips = 0.0003
-take_profit_pips = 0.0009
-total_profit_loss = 0
-
-for i in range(1, len(data)):
-    if data['ADX'][i] > 25:  # Only trade when ADX is above 25 (strong trend)
-        current_price = data['Close'][i]
-        
-        if not in_position:
-            # Buy Signal
-            if data['EMA9'][i] > data['EMA21'][i] and data['EMA9'][i-1] <= data['EMA21'][i-1]:
-                entry_price = current_price
-                stop_loss = entry_price - stop_loss_pips
-                take_profit = entry_price + take_profit_pips
-                in_position = True
-                trade_details.append({
-                    'Signal': 'Buy',
-                    'Date': data.index[i],
-                    'Entry Price': entry_price,
-                    'Stop Loss': stop_loss,
-                    'Take Profit': take_profit,
-                    'Exit Price': None,
-                    'Pip Change': None,
-                    'Dollar P/L': None,
-                })
-        else:
-            # Check for exit conditions including stop loss and take profit
-            if current_price <= trade_details[-1]['Stop Loss'] or current_price >= trade_details[-1]['Take Profit']:
-                exit_price = min(current_price, trade_details[-1]['Take Profit']) if current_price > entry_price else max(current_price, trade_details[-1]['Stop Loss'])
-                pip_change = (exit_price - entry_price) * 10000  # Convert to pips (assuming GBP/USD)
-                dollar_profit_loss = pip_change * 10  # Assume 1 pip = $0.01 for simplicity
-                
-                trade_details[-1]['Exit Price'] = exit_price
-                trade_details[-1]['Pip Change'] = pip_change
-                trade_details[-1]['Dollar P/L'] = dollar_profit_loss
-                in_position = False
-                total_profit_loss += dollar_profit_loss  # Add to total
-            # Check for sell signal if stop loss or take profit not hit
-            elif data['EMA9'][i] < data['EMA21'][i] and data['EMA9'][i-1] >= data['EMA21'][i-1]:
-                exit_price = current_price
-                pip_change = (exit_price - entry_price) * 10000  # Convert to pips
-                dollar_profit_loss = pip_change * 10  # Assume 1 pip = $0.01 for simplicity
-                
-                trade_details[-1]['Exit Price'] = exit_price
-                trade_details[-1]['Pip Change'] = pip_change
-                trade_details[-1]['Dollar P/L'] = dollar_profit_loss
-                in_position = False
-                total_profit_loss += dollar_profit_loss  # Add to total
-
-# Export trade details to a CSV file
-trades_df = pd.DataFrame(trade_details)
-trades_df.to_csv('isthisreal.csv', index=False)
-#data.to_csv('dataframe.csv', index=False)
-
-# Print total profit or loss
-print(f"Total Profit/Loss: ${total_profit_loss:.2f}")
\ No newline at end of file
+# Trade rows produced by simulate_trades
+def trade_fields(date_dtype):
+    return [
+        ('Signal', 'U4'), ('Date', date_dtype), ('Entry Price', 'f8'), ('Stop Loss', 'f8'),
+        ('Take Profit', 'f8'), ('Exit Price', 'f8'), ('Pip Change', 'f8'), ('Dollar P/L', 'f8'),
+    ]
+
+# Simulate trades; they are added to `trades` (a TradeLedger or TradeWriter) if given
+def simulate_trades(data, stop_loss_pips=3, take_profit_pips=9, pip_size=0.0001, pip_value=10, trades=None):
+    # Stop loss and take profit are given in pips; dividing by pips per unit
+    # gives exactly 0.0003 / 0.0009 for the default pip size
+    pips_per_unit = 1 / pip_size
+    stop_distance = stop_loss_pips / pips_per_unit
+    take_profit_distance = take_profit_pips / pips_per_unit
+    close = data['Close'].to_numpy(dtype=float)
+    n = len(close)
+    strong = data['ADX'].to_numpy(dtype=float) > 25  # Only trade when ADX is above 25 (strong trend)
+
+    # Crossover events, kept only where the trend is strong
+    up, down = crossings(data['EMA9'], data['EMA21'])
+    buy_signals, sell_signals = where(up, strong), where(down, strong)
+    # Stop loss / take profit are only checked on strong-trend bars
+    strong_close = np.where(strong, close, np.nan)
+
+    # Holding one position at a time makes each entry depend on the previous
+    # exit, so step from event to event instead of from bar to bar
+    entries, exits, level_exit = [], [], []
+    bar = 1
+    while True:
+        entry = next_event(buy_signals, bar, n)
+        if entry == n:
+            break
+        entries.append(entry)
+        entry_price = close[entry]
+        touch = first_touch(strong_close, entry + 1, entry_price - stop_distance, entry_price + take_profit_distance)
+        cross = next_event(sell_signals, entry + 1, n)
+        if min(touch, cross) == n:
+            break  # Still open at the end of the data
+        # Stop loss or take profit wins over a sell signal on the same bar
+        exits.append(min(touch, cross))
+        level_exit.append(touch <= cross)
+        bar = exits[-1] + 1
+
+    entries = np.asarray(entries, dtype=np.int64)
+    entry_price = close[entries]
+    stop_loss = entry_price - stop_distance
+    take_profit = entry_price + take_profit_distance
+
+    # Exit fields stay unset (NaN) for a trade still open at the end
+    closed = len(exits)
+    exit_close = close[np.asarray(exits, dtype=np.int64)]
+    clipped = np.where(
+        exit_close > entry_price[:closed],
+        np.minimum(exit_close, take_profit[:closed]),
+        np.maximum(exit_close, stop_loss[:closed]),
+    )
+    exit_price = np.full(len(entries), np.nan)
+    exit_price[:closed] = np.where(level_exit, clipped, exit_close)
+    pip_change = (exit_price - entry_price) * pips_per_unit  # Convert to pips
+    dollar_profit_loss = pip_change * pip_value  # Dollar value of one pip
+
+    trade_details = trades
+    if trade_details is None:
+        trade_details = TradeLedger(trade_fields(data.index.dtype), capacity=len(entries))
+    trade_details.extend({
+        'Signal': np.full(len(entries), 'Buy'),
+        'Date': data.index[entries],
+        'Entry Price': entry_price,
+        'Stop Loss': stop_loss,
+        'Take Profit': take_profit,
+        'Exit Price': exit_price,
+        'Pip Change': pip_change,
+        'Dollar P/L': dollar_profit_loss,
+    })
+    total_profit_loss = sum(dollar_profit_loss[:closed].tolist())  # Added up trade by trade, as before
+    return trade_details, total_profit_loss
+
+def main():
+    file_path = "USDCAD_H1_mt.csv"
+    with span('load'):
+        data = load_data(file_path)
+    with span('indicators'):
+        data = calculate_indicators(data)
+    # Export trade details to a CSV file, written in batches as they are added
+    with span('simulate'), TradeWriter('isthisreal.csv', trade_fields(data.index.dtype)) as trade_details:
+        _, total_profit_loss = simulate_trades(data, trades=trade_details)
+    #data.to_csv('dataframe.csv', index=False)
+
+    # Print total profit or loss
+    print(f"Total Profit/Loss: ${total_profit_loss:.2f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,239 @@
+import argparse
+import math
+import socket
+import time
+
+import numpy as np
+
+from indicators import StreamingADX, StreamingEMA
+from ledger import TradeLedger
+from trade_writer import TradeWriter
+
+# Event-driven version of ema_adx_algo for live bar feeds.
+#
+# EmaAdxEngine keeps EMA9/EMA21 and ADX state and applies the batch script's
+# entry and exit rules to one bar at a time, so a new bar costs a few
+# microseconds regardless of how much history came before it. Bars can come
+# from any iterator (run_bars), an asyncio queue (run_queue) or a TCP socket
+# of CSV lines (socket_bars). Closed trades go to a TradeWriter trade log as
+# they happen instead of rewriting the whole file; the live feed appends each
+# one to its CSV straight away (live_trade_log()).
+#
+# replay() feeds a historical CSV through the same engine; its trades are
+# identical to ema_adx_algo.simulate_trades on the same file.
+
+TRADE_DTYPE = np.dtype([
+    ('Signal', 'U4'), ('Date', 'O'), ('Entry Price', 'f8'), ('Stop Loss', 'f8'),
+    ('Take Profit', 'f8'), ('Exit Price', 'f8'), ('Pip Change', 'f8'), ('Dollar P/L', 'f8'),
+])
+TRADE_FIELDS = list(TRADE_DTYPE.names)
+
+
+def live_trade_log(path):
+    """
+    Append-only CSV trade log for a live feed: each closed trade is written as
+    soon as it is logged, and a header only goes into a new or empty file.
+    """
+    return TradeWriter(path, TRADE_DTYPE, format='csv', batch_rows=1, hold=0, mode='a')
+
+
+class EmaAdxEngine:
+    """
+    EMA crossover with ADX filter, updated one bar at a time.
+
+    Uses the same rules and parameters as ema_adx_algo.simulate_trades. Every
+    trade is recorded in `trades`, a TradeLedger; the open one is also kept
+    as a dict in `open_trade` until it closes.
+
+    Args:
+        trade_log (TradeWriter): Receives each trade when it closes, as a row of
+            TRADE_DTYPE fields.
+        on_signal (callable): Called as on_signal(signal, trade) on every 'Buy' and 'Exit'.
+    """
+
+    def __init__(self, stop_loss_pips=3, take_profit_pips=9, pip_size=0.0001, pip_value=10,
+                 adx_period=14, adx_threshold=25, trade_log=None, on_signal=None):
+        self.pips_per_unit = 1 / pip_size
+        # Price distances, computed as in ema_adx_algo.simulate_trades
+        self.stop_distance = stop_loss_pips / self.pips_per_unit
+        self.take_profit_distance = take_profit_pips / self.pips_per_unit
+        self.pip_value = pip_value
+        self.adx_threshold = adx_threshold
+        self.trade_log = trade_log
+        self.on_signal = on_signal
+
+        self._ema9 = StreamingEMA(9)
+        self._ema21 = StreamingEMA(21)
+        self._adx = StreamingADX(adx_period)
+        self._prev_ema9 = math.nan
+        self._prev_ema21 = math.nan
+        self.bars = 0
+        self.trades = TradeLedger(TRADE_DTYPE)
+        self.open_trade = None
+        self.total_profit_loss = 0
+
+    def on_bar(self, date, high, low, close):
+        """
+        Process one bar.
+
+        Returns:
+            str: 'Buy' or 'Exit' when the bar triggers a signal, otherwise None.
+        """
+        high, low, close = float(high), float(low), float(close)
+        ema9 = self._ema9.update(close)
+        ema21 = self._ema21.update(close)
+        adx = self._adx.update(high, low, close)
+        prev_ema9, prev_ema21 = self._prev_ema9, self._prev_ema21
+        self._prev_ema9, self._prev_ema21 = ema9, ema21
+        self.bars += 1
+
+        # The batch loop starts at the second bar and only acts on strong trends
+        if self.bars == 1 or not adx > self.adx_threshold:
+            return None
+
+        trade = self.open_trade
+        if trade is None:
+            # Buy Signal
+            if ema9 > ema21 and prev_ema9 <= prev_ema21:
+                trade = {
+                    'Signal': 'Buy',
+                    'Date': date,
+                    'Entry Price': close,
+                    'Stop Loss': close - self.stop_distance,
+                    'Take Profit': close + self.take_profit_distance,
+                    'Exit Price': None,
+                    'Pip Change': None,
+                    'Dollar P/L': None,
+                }
+                self.open_trade = trade
+                self.trades.append('Buy', date, trade['Entry Price'], trade['Stop Loss'], trade['Take Profit'])
+                return self._emit('Buy', trade)
+            return None
+
+        entry_price = trade['Entry Price']
+        if close <= trade['Stop Loss'] or close >= trade['Take Profit']:
+            exit_price = min(close, trade['Take Profit']) if close > entry_price else max(close, trade['Stop Loss'])
+        elif ema9 < ema21 and prev_ema9 >= prev_ema21:
+            exit_price = close
+        else:
+            return None
+
+        pip_change = (exit_price - entry_price) * self.pips_per_unit
+        dollar_profit_loss = pip_change * self.pip_value
+        trade['Exit Price'] = exit_price
+        trade['Pip Change'] = pip_change
+        trade['Dollar P/L'] = dollar_profit_loss
+        self.trades.update_last(**{'Exit Price': exit_price, 'Pip Change': pip_change, 'Dollar P/L': dollar_profit_loss})
+        self.total_profit_loss += dollar_profit_loss
+        self.open_trade = None
+        self._log(trade)
+        return self._emit('Exit', trade)
+
+    def _log(self, trade):
+        # Exit fields of an open trade are None; they stay unset (NaN)
+        if self.trade_log is not None:
+            self.trade_log.append(**{name: value for name, value in trade.items() if value is not None})
+
+    def log_open_trade(self):
+        """Write the trade still open, if any, to the trade log, as the batch script does at the end."""
+        if self.open_trade is not None:
+            self._log(self.open_trade)
+
+    def _emit(self, signal, trade):
+        if self.on_signal is not None:
+            self.on_signal(signal, trade)
+        return signal
+
+
+def run_bars(engine, bars):
+    """Feed (date, high, low, close) tuples from any iterable into the engine."""
+    for date, high, low, close in bars:
+        engine.on_bar(date, high, low, close)
+    return engine
+
+
+async def run_queue(engine, queue):
+    """Consume (date, high, low, close) tuples from an asyncio queue until a None arrives."""
+    while True:
+        bar = await queue.get()
+        if bar is None:
+            return engine
+        engine.on_bar(*bar)
+
+
+def socket_bars(host, port):
+    """Yield bars from a TCP feed sending one 'date,high,low,close' line per bar."""
+    with socket.create_connection((host, port)) as conn, conn.makefile('r', newline='') as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            date, high, low, close = line.strip().split(',')
+            yield date, float(high), float(low), float(close)
+
+
+def csv_bars(file_path):
+    """Yield bars from a historical CSV, loaded the same way as the batch script."""
+    import ema_adx_algo
+
+    data = ema_adx_algo.load_data(file_path)
+    yield from zip(data.index, data['High'].tolist(), data['Low'].tolist(), data['Close'].tolist())
+
+
+def replay(file_path, output_file='isthisreal_replay.csv', **engine_kwargs):
+    """
+    Replay a historical CSV through the live engine.
+
+    The trade log is started fresh, and a trade still open at the end is
+    written last, as the batch script does.
+
+    Returns:
+        EmaAdxEngine: The engine after the last bar.
+    """
+    with TradeWriter(output_file, TRADE_DTYPE) as trade_log:
+        engine = run_bars(EmaAdxEngine(trade_log=trade_log, **engine_kwargs), csv_bars(file_path))
+        engine.log_open_trade()
+    return engine
+
+
+def check_replay(file_path):
+    """Compare replayed trades with ema_adx_algo.simulate_trades; returns True when identical."""
+    import ema_adx_algo
+
+    data = ema_adx_algo.calculate_indicators(ema_adx_algo.load_data(file_path))
+    batch_trades, batch_total = ema_adx_algo.simulate_trades(data)
+    engine = run_bars(EmaAdxEngine(), csv_bars(file_path))
+    same_trades = engine.trades.to_frame().astype(object).equals(batch_trades.to_frame().astype(object))
+    return same_trades and engine.total_profit_loss == batch_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the EMA/ADX strategy on a live or replayed bar feed.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    replay_parser = subparsers.add_parser('replay', help='Feed a historical CSV through the live engine')
+    replay_parser.add_argument('file_path')
+    replay_parser.add_argument('--output', default='isthisreal_replay.csv')
+    replay_parser.add_argument('--check', action='store_true', help='Compare trades with the batch script')
+    live_parser = subparsers.add_parser('live', help='Trade bars from a TCP feed')
+    live_parser.add_argument('host')
+    live_parser.add_argument('port', type=int)
+    live_parser.add_argument('--output', default='isthisreal.csv')
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        start = time.perf_counter()
+        engine = replay(args.file_path, args.output)
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {engine.bars} bars in {elapsed:.3f}s ({elapsed / max(engine.bars, 1) * 1e6:.1f} us/bar)")
+        print(f"Total Profit/Loss: ${engine.total_profit_loss:.2f}")
+        if args.check:
+            print("Matches batch trades." if check_replay(args.file_path) else "Differs from batch trades!")
+    else:
+        def report(signal, trade):
+            print(f"{signal} at {trade['Date']}: {trade['Exit Price'] if signal == 'Exit' else trade['Entry Price']}")
+
+        with live_trade_log(args.output) as log:
+            run_bars(EmaAdxEngine(trade_log=log, on_signal=report), socket_bars(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import numpy as np
+
+# Event extraction for crossover strategies.
+#
+# Crossovers are rare compared to bars, so instead of testing every bar in a
+# Python loop the strategies find all event bars up front with array
+# comparisons and np.flatnonzero, filter them with boolean masks (an ADX
+# threshold, say), and only step through the events themselves. Positions
+# returned here are integer bar indices in increasing order.
+
+
+def crossings(fast, slow, start=1):
+    """
+    Bars where `fast` crosses `slow`.
+
+    Args:
+        fast, slow (array-like): Aligned series, e.g. EMA9 and EMA21.
+        start (int): First bar that can be an event (needs start - 1 >= 0).
+
+    Returns:
+        tuple: (up, down) where `up` holds bars with fast > slow after
+        fast <= slow on the bar before, and `down` bars with fast < slow after
+        fast >= slow. Comparisons with NaN are never events.
+    """
+    fast = np.asarray(fast, dtype=float)
+    slow = np.asarray(slow, dtype=float)
+    above, below = fast > slow, fast < slow
+    at_or_below, at_or_above = fast <= slow, fast >= slow
+    up = np.flatnonzero(above[1:] & at_or_below[:-1]) + 1
+    down = np.flatnonzero(below[1:] & at_or_above[:-1]) + 1
+    return up[up >= start], down[down >= start]
+
+
+def signal_flips(signal, start=1):
+    """
+    Bars where a +1/0/-1 signal turns long or short.
+
+    Returns:
+        tuple: (buys, sells) where buys have signal 1 after a signal <= 0 and
+        sells have signal -1 after a signal >= 0.
+    """
+    signal = np.asarray(signal)
+    buys = np.flatnonzero((signal[1:] == 1) & (signal[:-1] <= 0)) + 1
+    sells = np.flatnonzero((signal[1:] == -1) & (signal[:-1] >= 0)) + 1
+    return buys[buys >= start], sells[sells >= start]
+
+
+def where(events, mask):
+    """The events at which the boolean bar mask is True, e.g. where(up, adx > 25)."""
+    events = np.asarray(events, dtype=np.int64)
+    return events[np.asarray(mask, dtype=bool)[events]]
+
+
+def next_event(events, bar, default):
+    """First event at or after `bar`, or `default` if there is none."""
+    k = np.searchsorted(events, bar)
+    return int(events[k]) if k < len(events) else default
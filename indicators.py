@@ -0,0 +1,410 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Shared technical indicators.
+#
+# Batch functions take array-likes (Series or ndarrays) and return float64
+# NumPy arrays aligned with the input, NaN until the window is full. The
+# rolling ones run pandas rolling(...) and ewm(...) over the values, the same
+# O(n) computations the strategy scripts used before, so results are
+# bit-identical to them.
+#
+# Streaming classes hold constant state per indicator and return the latest
+# value from `update(...)`, so a new bar costs O(1) work instead of another
+# pass over the whole history. Their window sums, means and variances follow
+# pandas' rolling aggregations step for step, so fed the same bars both modes
+# give bit-identical values.
+
+
+def _as_float_array(values):
+    return np.asarray(values, dtype=float)
+
+
+def _rolling(values, window):
+    # Fixed-size window that needs every value in it (min_periods=window)
+    return pd.Series(_as_float_array(values)).rolling(max(window, 1))
+
+
+def _windowed(values, window, result):
+    if window < 1:
+        return np.full(len(values), np.nan)
+    return result.to_numpy(dtype=float)
+
+
+def _previous(values):
+    previous = np.empty_like(values)
+    previous[:1] = np.nan
+    previous[1:] = values[:-1]
+    return previous
+
+
+def rolling_sum(values, window):
+    """Rolling sum over `window` bars."""
+    return _windowed(values, window, _rolling(values, window).sum())
+
+
+def sma(values, window):
+    """Simple moving average over `window` bars."""
+    return _windowed(values, window, _rolling(values, window).mean())
+
+
+def rolling_std(values, window):
+    """Rolling sample standard deviation (ddof=1) over `window` bars."""
+    return _windowed(values, window, _rolling(values, window).std(ddof=1))
+
+
+def ema(values, span):
+    """Exponential moving average, `ewm(span=span, adjust=False).mean()`; StreamingEMA gives the same values."""
+    return pd.Series(_as_float_array(values)).ewm(span=span, adjust=False).mean().to_numpy(dtype=float)
+
+
+def rsi(close, period=14):
+    """RSI from simple rolling means of gains and losses."""
+    close = _as_float_array(close)
+    delta = close - _previous(close)
+    gain = sma(np.where(delta > 0, delta, 0.0), period)
+    loss = sma(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def true_range(high, low, close, legacy=False):
+    """
+    True range using the previous bar's close; the first bar falls back to High - Low.
+
+    Args:
+        legacy (bool): Measure against the current bar's close instead, as the
+            swing script originally did. Kept for comparing old results.
+    """
+    high, low, close = _as_float_array(high), _as_float_array(low), _as_float_array(close)
+    ref_close = close if legacy else _previous(close)
+    return np.fmax(high - low, np.fmax(np.abs(high - ref_close), np.abs(low - ref_close)))
+
+
+def atr(high, low, close, period=14, legacy=False):
+    """Average true range as a simple rolling mean of the true range."""
+    return sma(true_range(high, low, close, legacy=legacy), period)
+
+
+def bollinger_bands(close, window=20, num_std=2):
+    """
+    Bollinger Bands.
+
+    Returns:
+        tuple: (middle, upper, lower, std) arrays.
+    """
+    middle = sma(close, window)
+    std = rolling_std(close, window)
+    return middle, middle + (std * num_std), middle - (std * num_std), std
+
+
+def directional_indicators(high, low, close, period=14):
+    """
+    +DI and -DI from rolling sums of true range and directional movement.
+
+    Returns:
+        tuple: (plus_di, minus_di) arrays.
+    """
+    high, low = _as_float_array(high), _as_float_array(low)
+    prev_high, prev_low = _previous(high), _previous(low)
+    plus_dm = np.where(high > prev_high, high - prev_high, 0.0)
+    minus_dm = np.where(low < prev_low, prev_low - low, 0.0)
+    tr_smooth = rolling_sum(true_range(high, low, close), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (rolling_sum(plus_dm, period) / tr_smooth)
+        minus_di = 100 * (rolling_sum(minus_dm, period) / tr_smooth)
+    return plus_di, minus_di
+
+
+def adx(high, low, close, period=14):
+    """ADX as used by ema_adx_algo: the directional index of the rolling-sum DIs."""
+    plus_di, minus_di = directional_indicators(high, low, close, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * (np.abs(plus_di - minus_di) / (plus_di + minus_di))
+
+
+class _WindowSum:
+    # Rolling sum computed the way pandas rolling(window).sum() does it, so
+    # streaming values are bit-identical to rolling_sum: Kahan-compensated
+    # adds and removes (with separate compensation terms), NaNs skipped, and a
+    # run of identical values returned as value * count.
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self._reset()
+
+    def _reset(self):
+        self.values.clear()
+        self.total = 0.0
+        self.add_compensation = 0.0
+        self.remove_compensation = 0.0
+        self.count = 0
+        self.same_run = 0
+        self.last = None
+
+    def push(self, value):
+        if self.window == 1:
+            # pandas restarts the sum when consecutive windows do not overlap
+            self._reset()
+        if self.last is None:
+            self.last = value
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            if not math.isnan(old):
+                self.count -= 1
+                y = -old - self.remove_compensation
+                t = self.total + y
+                self.remove_compensation = t - self.total - y
+                self.total = t
+        self.values.append(value)
+        if not math.isnan(value):
+            self.count += 1
+            y = value - self.add_compensation
+            t = self.total + y
+            self.add_compensation = t - self.total - y
+            self.total = t
+            self.same_run = self.same_run + 1 if value == self.last else 1
+            self.last = value
+        if self.count < self.window:
+            return math.nan
+        return self.last * self.count if self.same_run >= self.count else self.total
+
+
+class _WindowMean(_WindowSum):
+    # Rolling mean the way pandas rolling(window).mean() computes it: the same
+    # compensated sum, divided by the count, with the sign of the result
+    # forced to match a window of all non-negative or all negative values.
+
+    def _reset(self):
+        super()._reset()
+        self.negative = 0
+
+    def push(self, value):
+        if len(self.values) == self.window > 1 and self._is_negative(self.values[0]):
+            self.negative -= 1
+        total = super().push(value)
+        if self._is_negative(value):
+            self.negative += 1
+        if math.isnan(total) or self.count == 0:
+            return math.nan
+        if self.same_run >= self.count:
+            return self.last
+        mean = self.total / self.count
+        if (self.negative == 0 and mean < 0) or (self.negative == self.count and mean > 0):
+            return 0.0
+        return mean
+
+    @staticmethod
+    def _is_negative(value):
+        return not math.isnan(value) and math.copysign(1.0, value) < 0
+
+
+class _WindowVar:
+    # Rolling variance the way pandas rolling(window).var() computes it: a
+    # Kahan-compensated Welford update for each value added and removed, and
+    # a fresh pass over the window whenever the sum of squared deviations
+    # loses most of its precision to a removal.
+
+    # Relative drop in the sum of squares that forces the fresh pass
+    _INV_COND_TOL = np.finfo(float).eps * 1e3
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self._clear()
+
+    def _clear(self):
+        self.count = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.add_compensation = 0.0
+        self.remove_compensation = 0.0
+        self.unstable = False
+
+    def _add(self, value):
+        if math.isnan(value):
+            return
+        previous = self.ssqdm
+        self.count += 1
+        prev_mean = self.mean - self.add_compensation
+        y = value - self.add_compensation
+        t = y - self.mean
+        self.add_compensation = t + self.mean - y
+        self.mean += t / self.count
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+        if previous * self._INV_COND_TOL > self.ssqdm:
+            self.unstable = True
+
+    def _remove(self, value):
+        if math.isnan(value):
+            return
+        previous = self.ssqdm
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+            self.unstable = False
+            return
+        prev_mean = self.mean - self.remove_compensation
+        y = value - self.remove_compensation
+        t = y - self.mean
+        self.remove_compensation = t + self.mean - y
+        self.mean -= t / self.count
+        self.ssqdm -= (value - prev_mean) * (value - self.mean)
+        if previous * self._INV_COND_TOL > self.ssqdm:
+            self.unstable = True
+
+    def push(self, value):
+        # pandas starts over on the first value and whenever consecutive
+        # windows do not overlap (a window of one)
+        recompute = not self.values or self.window == 1
+        if recompute:
+            self.values.clear()
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(value)
+        if recompute or self.unstable:
+            self._clear()
+            for v in self.values:
+                self._add(v)
+            self.unstable = False
+        else:
+            self._add(value)
+        if self.count < max(self.window, 1) or self.count <= self.ddof:
+            return math.nan
+        return self.ssqdm / (self.count - self.ddof)
+
+
+class StreamingSMA:
+    """Simple moving average updated one value at a time."""
+
+    def __init__(self, window):
+        self._window = _WindowMean(window)
+
+    def update(self, value):
+        return self._window.push(float(value))
+
+
+class StreamingStd:
+    """Rolling sample standard deviation (ddof=1) updated one value at a time."""
+
+    def __init__(self, window):
+        self._window = _WindowVar(window)
+
+    def update(self, value):
+        # Rounding can leave a tiny negative variance, read as 0 like pandas
+        # does; max() keeps a NaN since NaN never compares greater
+        return math.sqrt(max(self._window.push(float(value)), 0.0))
+
+
+class StreamingEMA:
+    """Exponential moving average, equivalent to `ewm(span=span, adjust=False)`."""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = math.nan
+
+    def update(self, value):
+        value = float(value)
+        if math.isnan(self.value):
+            self.value = value
+        elif not math.isnan(value) and self.value != value:
+            old_weight = 1.0 - self.alpha
+            self.value = (old_weight * self.value + self.alpha * value) / (old_weight + self.alpha)
+        return self.value
+
+
+class StreamingRSI:
+    """RSI from simple rolling means of gains and losses."""
+
+    def __init__(self, period=14):
+        self._gain = StreamingSMA(period)
+        self._loss = StreamingSMA(period)
+        self._prev_close = math.nan
+
+    def update(self, close):
+        close = float(close)
+        delta = close - self._prev_close
+        self._prev_close = close
+        avg_gain = self._gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self._loss.update(-delta if delta < 0 else 0.0)
+        if math.isnan(avg_gain) or math.isnan(avg_loss) or (avg_gain == 0 and avg_loss == 0):
+            return math.nan
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+class StreamingTrueRange:
+    """True range against the previous close; the first bar falls back to High - Low."""
+
+    def __init__(self):
+        self.prev_close = math.nan
+
+    def update(self, high, low, close):
+        ranges = [r for r in (high - low, abs(high - self.prev_close), abs(low - self.prev_close)) if not math.isnan(r)]
+        self.prev_close = close
+        return max(ranges) if ranges else math.nan
+
+
+class StreamingATR:
+    """Average true range as a simple rolling mean of the true range."""
+
+    def __init__(self, period=14):
+        self._true_range = StreamingTrueRange()
+        self._mean = StreamingSMA(period)
+
+    def update(self, high, low, close):
+        return self._mean.update(self._true_range.update(float(high), float(low), float(close)))
+
+
+class StreamingBollinger:
+    """Bollinger Bands; `update` returns (middle, upper, lower, std)."""
+
+    def __init__(self, window=20, num_std=2):
+        self.num_std = num_std
+        self._mean = StreamingSMA(window)
+        self._std = StreamingStd(window)
+
+    def update(self, close):
+        middle = self._mean.update(close)
+        std = self._std.update(close)
+        return middle, middle + (std * self.num_std), middle - (std * self.num_std), std
+
+
+class StreamingADX:
+    """
+    ADX as used by ema_adx_algo, from rolling sums of true range and directional movement.
+
+    The window sums follow pandas exactly, so values are bit-identical to the
+    batch adx() and an ADX threshold filters the same bars in both modes.
+    """
+
+    def __init__(self, period=14):
+        self._true_range = StreamingTrueRange()
+        self._tr = _WindowSum(period)
+        self._plus_dm = _WindowSum(period)
+        self._minus_dm = _WindowSum(period)
+        self._prev_high = math.nan
+        self._prev_low = math.nan
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        tr_smooth = self._tr.push(self._true_range.update(high, low, close))
+        plus_dm = self._plus_dm.push(high - self._prev_high if high > self._prev_high else 0.0)
+        minus_dm = self._minus_dm.push(self._prev_low - low if low < self._prev_low else 0.0)
+        self._prev_high, self._prev_low = high, low
+
+        if math.isnan(tr_smooth) or tr_smooth == 0:
+            return math.nan
+        plus_di = 100 * (plus_dm / tr_smooth)
+        minus_di = 100 * (minus_dm / tr_smooth)
+        if plus_di + minus_di == 0:
+            return math.nan
+        return 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
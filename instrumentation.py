@@ -0,0 +1,182 @@
+import atexit
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+
+# Per-phase timing for the strategy scripts.
+#
+# Scripts wrap their phases in `with span('load'):` (or decorate functions
+# with @timed('simulate')). Until instrumentation is enabled, span() returns
+# one shared no-op context manager, so a disabled span costs a function call.
+#
+# When enabled, each span records wall and CPU time, and nested spans are
+# reported under their parent's name ('main/simulate'). Optionally the whole
+# run is profiled with cProfile, and tracemalloc records the peak traced
+# memory reached during every span. report() returns everything as a dict and
+# write_report() saves it as JSON.
+#
+# To instrument an unmodified run, set STRATEGY_PROFILE to the report path
+# before starting a script; STRATEGY_PROFILE_CPROFILE=1 and
+# STRATEGY_PROFILE_TRACEMALLOC=1 add the optional captures. The report is
+# written when the interpreter exits.
+
+PROFILE_ENV = 'STRATEGY_PROFILE'
+CPROFILE_ENV = 'STRATEGY_PROFILE_CPROFILE'
+TRACEMALLOC_ENV = 'STRATEGY_PROFILE_TRACEMALLOC'
+
+_NULL_SPAN = contextlib.nullcontext()
+_session = None
+
+
+class _Session:
+    def __init__(self, profile, memory):
+        self.stats = {}
+        self.stack = []
+        self.started = time.perf_counter()
+        self.profiler = cProfile.Profile() if profile else None
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        path = '/'.join([frame['path'] for frame in self.stack[-1:]] + [name])
+        frame = {'path': path, 'peak': 0}
+        if self.memory:
+            self._fold_peak()
+        self.stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if self.memory:
+                self._fold_peak()
+            self.stack.pop()
+            if self.memory and self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1]['peak'], frame['peak'])
+            entry = self.stats.setdefault(path, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': None})
+            entry['calls'] += 1
+            entry['wall_s'] += wall
+            entry['cpu_s'] += cpu
+            if self.memory:
+                entry['peak_bytes'] = max(entry['peak_bytes'] or 0, frame['peak'])
+
+    def _fold_peak(self):
+        # tracemalloc has one peak counter; credit it to the innermost open
+        # span and start a new measurement
+        _, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+
+def enable(profile=False, memory=False):
+    """
+    Start recording spans.
+
+    Args:
+        profile (bool): Also run cProfile until report() is called.
+        memory (bool): Record the peak traced memory reached in each span with tracemalloc.
+    """
+    global _session
+    _session = _Session(profile, memory)
+
+
+def disable():
+    """Stop recording; spans become no-ops again and the recorded data is dropped."""
+    global _session
+    if _session is not None:
+        _session.stop()
+    _session = None
+
+
+def enabled():
+    return _session is not None
+
+
+def span(name):
+    """Context manager timing the enclosed block as phase `name`."""
+    if _session is None:
+        return _NULL_SPAN
+    return _session.span(name)
+
+
+def timed(name=None):
+    """Decorator recording every call of the function as a span (named after it by default)."""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _session is None:
+                return func(*args, **kwargs)
+            with _session.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def report(top=25):
+    """
+    Everything recorded so far.
+
+    Args:
+        top (int): Functions listed from the cProfile capture, by cumulative time.
+
+    Returns:
+        dict: 'wall_s' since enable(), 'spans' (one entry per span path with
+        calls, wall_s, cpu_s and peak_bytes) and, with profiling, 'profile'.
+    """
+    if _session is None:
+        return {'spans': []}
+    result = {
+        'wall_s': time.perf_counter() - _session.started,
+        'spans': [{'name': path, **entry} for path, entry in _session.stats.items()],
+    }
+    if _session.profiler is not None:
+        _session.profiler.disable()
+        stats = pstats.Stats(_session.profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                'function': f'{filename}:{line}({function})',
+                'calls': calls,
+                'tottime_s': total,
+                'cumtime_s': cumulative,
+            })
+        rows.sort(key=lambda row: row['cumtime_s'], reverse=True)
+        result['profile'] = rows[:top]
+        _session.profiler.enable()
+    return result
+
+
+def write_report(path, top=25):
+    """Save report() as JSON; with profiling, the raw cProfile stats go to `path` + '.prof'."""
+    with open(path, 'w') as f:
+        json.dump(report(top), f, indent=2)
+    if _session is not None and _session.profiler is not None:
+        _session.profiler.dump_stats(path + '.prof')
+
+
+def _enable_from_environment():
+    path = os.environ.get(PROFILE_ENV)
+    if not path:
+        return
+    enable(profile=os.environ.get(CPROFILE_ENV) == '1', memory=os.environ.get(TRACEMALLOC_ENV) == '1')
+    atexit.register(write_report, path)
+
+
+_enable_from_environment()
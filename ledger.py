@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Array-backed trade records shared by the strategy scripts.
+#
+# A TradeLedger keeps one preallocated NumPy array per field and doubles
+# them when they fill up, so a trade costs a few array writes instead of a
+# dict per row. Unset float fields are NaN, which exports as an empty CSV
+# cell just like the None the scripts used to store for open trades.
+
+
+class TradeLedger:
+    """
+    Growable column store for trade rows.
+
+    Args:
+        fields: (name, dtype) pairs in column order, or anything np.dtype accepts.
+        capacity (int): Rows allocated up front.
+    """
+
+    def __init__(self, fields, capacity=256):
+        self.dtype = np.dtype(fields)
+        self.names = self.dtype.names
+        self.count = 0
+        self.columns = {name: self._empty(self.dtype[name], max(capacity, 1)) for name in self.names}
+
+    @staticmethod
+    def _empty(dtype, size):
+        if dtype.kind == 'f':
+            return np.full(size, np.nan, dtype=dtype)
+        return np.zeros(size, dtype=dtype)
+
+    def _reserve(self, size):
+        capacity = len(self.columns[self.names[0]])
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, values in self.columns.items():
+            grown = self._empty(values.dtype, capacity)
+            grown[:self.count] = values[:self.count]
+            self.columns[name] = grown
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        """Column `name` as a view of the filled rows."""
+        return self.columns[name][:self.count]
+
+    def append(self, *values, **named):
+        """Add one row, given positionally in field order and/or by name; omitted fields stay unset."""
+        self._reserve(self.count + 1)
+        row = self.count
+        for name, value in zip(self.names, values):
+            self.columns[name][row] = value
+        for name, value in named.items():
+            self.columns[name][row] = value
+        self.count += 1
+
+    def update_last(self, **values):
+        """Overwrite fields of the most recent row, e.g. to close an open trade."""
+        if not self.count:
+            raise IndexError("update_last on an empty ledger")
+        for name, value in values.items():
+            self.columns[name][self.count - 1] = value
+
+    def extend(self, columns):
+        """Append many rows at once from a mapping of field name -> equal-length array."""
+        size = len(next(iter(columns.values()))) if columns else 0
+        self._reserve(self.count + size)
+        for name, values in columns.items():
+            self.columns[name][self.count:self.count + size] = values
+        self.count += size
+
+    def drain(self, keep=0):
+        """
+        Remove all but the last `keep` rows and return them as column arrays.
+
+        The kept rows move to the front, so update_last still reaches them.
+        """
+        size = max(self.count - keep, 0)
+        drained = {name: values[:size].copy() for name, values in self.columns.items()}
+        for name, values in self.columns.items():
+            values[:self.count - size] = values[size:self.count]
+            values[self.count - size:self.count] = self._empty(values.dtype, size)
+        self.count -= size
+        return drained
+
+    def to_frame(self, copy=False):
+        """
+        DataFrame of the filled rows.
+
+        Without `copy`, numeric columns share memory with the ledger, so copy
+        the frame (or pass copy=True) before modifying it in place.
+        """
+        return pd.DataFrame({name: self[name] for name in self.names}, copy=copy)
+
+    def to_csv(self, path, **kwargs):
+        self.to_frame().to_csv(path, index=False, **kwargs)
+
+    def to_parquet(self, path, **kwargs):
+        """Write the rows to Parquet (requires pyarrow or fastparquet)."""
+        self.to_frame().to_parquet(path, index=False, **kwargs)
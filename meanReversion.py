@@ -1,85 +1,141 @@
 import pandas as pd
 import numpy as np
 
+from barriers import first_touch
+from data_loader import load_csv
+from indicators import rsi, sma
+from instrumentation import span
+from ledger import TradeLedger
+from trade_writer import TradeWriter
+
 # Load your CSV data
 def load_data(file_path):
-    df = pd.read_csv(file_path)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df.set_index('Date', inplace=True)
-    return df
+    return load_csv(file_path, parse_dates=['Date'], index_col='Date')
 
 # Calculate indicators
 def calculate_indicators(df):
     # Simple Moving Average (SMA)
-    df['SMA50'] = df['Close'].rolling(window=50).mean()
+    df['SMA50'] = sma(df['Close'], 50)
     
     # RSI Calculation
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
+    df['RSI'] = rsi(df['Close'], 14)
 
     return df
 
-# Backtest strategy
-def backtest_strategy(df, stop_loss_pips=10, take_profit_pips=10):
-    initial_balance = 10000
-    balance = initial_balance
-    position = 0
-    stop_loss = 0
-    take_profit = 0
-    trades = []
-
-    for i in range(1, len(df)):
-        # Check for entry
+# Trade rows produced by run_backtest; 'bar' is the positional index of the bar
+TRADE_DTYPE = np.dtype([('type', 'U4'), ('price', 'f8'), ('bar', 'i8'), ('profit_loss', 'f8')])
+
+# Trade rows when run_backtest is given the bar dates, as written to the CSV
+def dated_fields(dates):
+    return [('type', 'U4'), ('price', 'f8'), ('date', np.asarray(dates).dtype), ('profit_loss', 'f8')]
+
+# Position state machine over plain arrays
+def run_backtest(close, sma50, rsi, stop_loss_pips=10, take_profit_pips=10, pip_size=0.0001, pip_value=10,
+                 start=1, state=None, trades=None, dates=None):
+    """
+    Simulate the mean reversion strategy without pandas lookups.
+
+    While flat, the next entry is found by searching the precomputed entry
+    signals; while in a position, the exit is the first later close that
+    touches the stop loss or take profit. A run can be split over consecutive
+    chunks of bars by passing the same `state` dict to each call.
+
+    Args:
+        close, sma50, rsi (array-like): Aligned indicator columns.
+        stop_loss_pips (float): Stop loss distance in pips.
+        take_profit_pips (float): Take profit distance in pips.
+        pip_size (float): Price change of one pip.
+        pip_value (float): Dollar value of one pip.
+        start (int): First bar to trade; earlier bars only warm up the indicators.
+        state (dict): Balance and open position, updated in place when the call returns.
+        trades (TradeLedger): Ledger to append to, or a TradeWriter to stream
+            the rows to a file; its last row must be the entry of the open
+            position carried in `state`, if any.
+        dates (array-like): Bar dates; if given, rows hold the bar's date
+            instead of its position (dated_fields() instead of TRADE_DTYPE).
+
+    Returns:
+        tuple: (trades, balance) where trades holds one row per entry and exit.
+    """
+    close = np.ascontiguousarray(close, dtype=float)
+    sma50 = np.asarray(sma50, dtype=float)
+    rsi = np.asarray(rsi, dtype=float)
+
+    # Entry signals from the first traded bar on; longs take priority
+    go_long = (close < sma50) & (rsi < 30)  # Oversold
+    go_short = ~go_long & (close > sma50) & (rsi > 70)  # Overbought
+    entries = np.flatnonzero(go_long | go_short)
+    entries = entries[entries >= start]
+
+    state = {} if state is None else state
+    balance = state.get('balance', 10000)
+    position = state.get('position', 0)
+    entry_price = state.get('entry_price', 0)
+    stop_loss = state.get('stop_loss', 0)
+    take_profit = state.get('take_profit', 0)
+    n = len(close)
+    stamps = np.arange(n) if dates is None else np.asarray(dates)
+    if trades is None:
+        # Each entry adds at most two rows (entry and exit)
+        fields = TRADE_DTYPE if dates is None else dated_fields(stamps)
+        trades = TradeLedger(fields, capacity=2 * len(entries))
+    i = start
+
+    while True:
         if position == 0:
-            if (
-                df['Close'].iloc[i] < df['SMA50'].iloc[i] and
-                df['RSI'].iloc[i] < 30  # Oversold
-            ):
+            # Flat: jump to the next entry signal
+            k = np.searchsorted(entries, i)
+            if k == len(entries):
+                break
+            i = entries[k]
+            entry_price = close[i]
+            if go_long[i]:
                 position = 1  # Long position
-                entry_price = df['Close'].iloc[i]
-                stop_loss = entry_price - (stop_loss_pips * 0.0001)
-                take_profit = entry_price + (take_profit_pips * 0.0001)
-                trades.append({'type': 'buy', 'price': entry_price, 'date': df.index[i], 'profit_loss': 0})
-
-            elif (
-                df['Close'].iloc[i] > df['SMA50'].iloc[i] and
-                df['RSI'].iloc[i] > 70  # Overbought
-            ):
+                stop_loss = entry_price - (stop_loss_pips * pip_size)
+                take_profit = entry_price + (take_profit_pips * pip_size)
+                trades.append('buy', entry_price, stamps[i], 0)
+            else:
                 position = -1  # Short position
-                entry_price = df['Close'].iloc[i]
-                stop_loss = entry_price + (stop_loss_pips * 0.0001)
-                take_profit = entry_price - (take_profit_pips * 0.0001)
-                trades.append({'type': 'sell', 'price': entry_price, 'date': df.index[i], 'profit_loss': 0})
-
-        # Check for exit
-        elif position == 1:
-            if df['Close'].iloc[i] <= stop_loss or df['Close'].iloc[i] >= take_profit:
-                profit_loss = (df['Close'].iloc[i] - entry_price) / 0.0001 * 10
-                balance += profit_loss
-                trades[-1]['profit_loss'] = profit_loss
-                position = 0
-                trades.append({'type': 'sell', 'price': df['Close'].iloc[i], 'date': df.index[i], 'profit_loss': profit_loss})
-
-        elif position == -1:
-            if df['Close'].iloc[i] >= stop_loss or df['Close'].iloc[i] <= take_profit:
-                profit_loss = (entry_price - df['Close'].iloc[i]) / 0.0001 * 10
-                balance += profit_loss
-                trades[-1]['profit_loss'] = profit_loss
-                position = 0
-                trades.append({'type': 'buy', 'price': df['Close'].iloc[i], 'date': df.index[i], 'profit_loss': profit_loss})
+                stop_loss = entry_price + (stop_loss_pips * pip_size)
+                take_profit = entry_price - (take_profit_pips * pip_size)
+                trades.append('sell', entry_price, stamps[i], 0)
+            i += 1
+
+        # In a position: exit on the first close beyond either level
+        if position == 1:
+            exit_bar = first_touch(close, i, stop_loss, take_profit)
+        else:
+            exit_bar = first_touch(close, i, take_profit, stop_loss)
+        if exit_bar == n:
+            break
+        exit_price = close[exit_bar]
+        if position == 1:
+            profit_loss = (exit_price - entry_price) / pip_size * pip_value
+        else:
+            profit_loss = (entry_price - exit_price) / pip_size * pip_value
+        balance += profit_loss
+        trades.update_last(profit_loss=profit_loss)
+        trades.append('sell' if position == 1 else 'buy', exit_price, stamps[exit_bar], profit_loss)
+        position = 0
+        i = exit_bar + 1
+
+    state.update(balance=balance, position=position, entry_price=entry_price, stop_loss=stop_loss,
+                 take_profit=take_profit)
+    return trades, balance
+
+# Backtest strategy
+def backtest_strategy(df, stop_loss_pips=10, take_profit_pips=10):
+    initial_balance = 10000
+    # Trades are written to the CSV in batches while the backtest runs
+    with span('simulate'), TradeWriter('mean_reversion_trades.csv', dated_fields(df.index)) as trades:
+        _, balance = run_backtest(df['Close'], df['SMA50'], df['RSI'], stop_loss_pips, take_profit_pips,
+                                  trades=trades, dates=df.index)
 
     # Summary
     profit = balance - initial_balance
     print(f"Initial Balance: ${initial_balance}")
     print(f"Final Balance: ${balance}")
     print(f"Net Profit: ${profit}")
-
-    # Save trades to CSV
-    trades_df = pd.DataFrame(trades)
-    trades_df.to_csv('mean_reversion_trades.csv', index=False)
     print("Trades saved to mean_reversion_trades.csv")
 
     return trades
@@ -87,8 +143,10 @@ def backtest_strategy(df, stop_loss_pips=10, take_profit_pips=10):
 # Main function
 def main():
     file_path = 'USDCHF_M30_xsb (1).csv'  # Replace with your file path
-    df = load_data(file_path)
-    df = calculate_indicators(df)
+    with span('load'):
+        df = load_data(file_path)
+    with span('indicators'):
+        df = calculate_indicators(df)
     backtest_strategy(df)
 
 if __name__ == "__main__":
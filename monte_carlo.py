@@ -0,0 +1,206 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from trade_writer import column_names, read_trades
+
+# Monte Carlo robustness checks on a strategy's per-trade P/L.
+#
+# A backtest gives one ordering of its trades and so one equity path. Here
+# many alternative paths are generated from the same trades, either by
+# bootstrap (drawing trades with replacement) or by shuffling their order,
+# and each path's final P/L, maximum drawdown and whether it hit the ruin
+# level are recorded.
+#
+# Paths are generated in chunks: a (paths x trades) matrix per chunk goes
+# through cumsum and maximum.accumulate along the rows, so every path in the
+# chunk is handled by the same few NumPy calls. Shuffled chunks order the
+# trades by the argsort of a random matrix of the same shape. The chunk height is chosen to
+# keep each matrix under a memory budget. Every chunk has its own seed spawned
+# from the run's seed, so results do not depend on how many worker processes
+# the chunks are spread over.
+
+INITIAL_BALANCE = 10000
+
+# Per-trade P/L column of each script's trade CSV. The paired layout
+# (meanReversion, rangeTrading) repeats each trade's P/L on its entry row, so
+# only exit rows are used there. Pip columns (commoditycorrelation) are not
+# dollars and need a dollar value per pip before they can be compared with
+# the balance.
+PNL_COLUMNS = ['Dollar P/L', 'Profit/Loss ($)', 'Profit/Loss (PIP)']
+PIP_PNL_COLUMNS = ['Profit/Loss (PIP)']
+PAIRED_PNL_COLUMN = 'profit_loss'
+
+METHODS = ('bootstrap', 'shuffle')
+
+
+def pnl_column(names):
+    """The P/L column among a trade table's column `names`."""
+    if PAIRED_PNL_COLUMN in names:
+        return PAIRED_PNL_COLUMN
+    column = next((name for name in PNL_COLUMNS if name in names), None)
+    if column is None:
+        raise ValueError(f"No P/L column found; expected one of {PNL_COLUMNS + [PAIRED_PNL_COLUMN]}.")
+    return column
+
+
+def trade_pnl(trades, pip_value=None):
+    """
+    Per-trade dollar P/L from any strategy's trade table.
+
+    Args:
+        trades (pd.DataFrame or TradeLedger): Trades as the scripts write them.
+        pip_value (float): Dollars per pip; required when the P/L is in pips.
+
+    Returns:
+        np.ndarray: Realised P/L per closed trade.
+    """
+    if not isinstance(trades, pd.DataFrame):
+        trades = trades.to_frame()
+    column = pnl_column(list(trades.columns))
+    pnl = trades[column].to_numpy(dtype=float)
+    if column == PAIRED_PNL_COLUMN:
+        # Entry and exit rows alternate; an open final entry has no exit row
+        pnl = pnl[1::2]
+    elif column in PIP_PNL_COLUMNS:
+        if pip_value is None:
+            raise ValueError(f"'{column}' is in pips; pass the dollar value of one pip (--pip-value).")
+        pnl = pnl * pip_value
+    return pnl[~np.isnan(pnl)]
+
+
+def _shuffled(pnl, paths, rng):
+    # Every row is pnl in the order of the argsort of a row of random keys.
+    # The keys are floats in [0, 1) with their column index written into the
+    # lowest mantissa bits, so sorting the keys in place (a SIMD sort, several
+    # times faster than argsort or rng.permuted) carries the indices along.
+    # Float order is bit order for non-negative floats; ties in the remaining
+    # random bits are negligible and fall back to index order.
+    n = len(pnl)
+    index_mask = np.uint64((1 << max(n - 1, 1).bit_length()) - 1)
+    keys = rng.random((paths, n))
+    bits = keys.view(np.uint64)
+    bits &= ~index_mask
+    bits |= np.arange(n, dtype=np.uint64)
+    keys.sort(axis=1)
+    bits &= index_mask
+    return pnl[bits.view(np.int64)]
+
+
+def _chunk_stats(task):
+    pnl, paths, n_trades, method, seed, initial_balance, ruin_level = task
+    rng = np.random.default_rng(seed)
+    if method == 'bootstrap':
+        equity = pnl[rng.integers(0, len(pnl), size=(paths, n_trades))]
+    else:
+        equity = _shuffled(pnl, paths, rng)
+    np.cumsum(equity, axis=1, out=equity)
+    equity += initial_balance
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, initial_balance, out=peak)
+    lowest = equity.min(axis=1)
+    final = equity[:, -1] - initial_balance
+    # Drawdown in dollars, then as a fraction of the running peak
+    np.subtract(peak, equity, out=equity)
+    max_drawdown = equity.max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(equity, peak, out=equity)
+    max_drawdown_pct = equity.max(axis=1)
+    return final, max_drawdown, max_drawdown_pct, np.minimum(lowest, initial_balance) <= ruin_level
+
+
+def simulate(pnl, n_paths=10_000, method='bootstrap', n_trades=None, initial_balance=INITIAL_BALANCE,
+             ruin_fraction=0.5, seed=0, max_chunk_bytes=64 * 1024 ** 2, max_workers=1):
+    """
+    Final P/L, drawdown and ruin of many resampled equity paths.
+
+    Args:
+        pnl (array-like): Per-trade P/L, e.g. from trade_pnl.
+        n_paths (int): Number of paths.
+        method (str): 'bootstrap' draws trades with replacement; 'shuffle'
+            permutes the actual trades, so only the order changes.
+        n_trades (int): Trades per bootstrap path. Defaults to len(pnl);
+            shuffled paths always use every trade once.
+        initial_balance (float): Starting equity of every path.
+        ruin_fraction (float): A path is ruined once equity falls to
+            initial_balance * (1 - ruin_fraction) or below.
+        seed (int): Seed for reproducible paths.
+        max_chunk_bytes (int): Memory budget for one chunk's path matrix.
+        max_workers (int): Worker processes; None uses every CPU.
+
+    Returns:
+        dict: 'final_pnl', 'max_drawdown' (dollars), 'max_drawdown_pct'
+        (fraction of the peak) and 'ruined' (bool), one entry per path.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}.")
+    pnl = np.asarray(pnl, dtype=float)
+    if len(pnl) == 0:
+        raise ValueError("No trades to resample.")
+    n_trades = len(pnl) if method == 'shuffle' or n_trades is None else n_trades
+    chunk = max(1, max_chunk_bytes // (8 * n_trades))
+    sizes = [min(chunk, n_paths - start) for start in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    ruin_level = initial_balance * (1 - ruin_fraction)
+    tasks = [(pnl, size, n_trades, method, child, initial_balance, ruin_level) for size, child in zip(sizes, seeds)]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers) as executor:
+            results = list(executor.map(_chunk_stats, tasks))
+    else:
+        results = [_chunk_stats(task) for task in tasks]
+    names = ['final_pnl', 'max_drawdown', 'max_drawdown_pct', 'ruined']
+    return {name: np.concatenate([result[k] for result in results]) for k, name in enumerate(names)}
+
+
+def summarize(paths, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """
+    Distribution summary of simulate()'s output.
+
+    Returns:
+        pd.DataFrame: Quantiles of final P/L and drawdowns (rows), plus the
+        mean and the probability of ruin and of a loss.
+    """
+    table = pd.DataFrame({
+        name: np.quantile(paths[name], quantiles) for name in ('final_pnl', 'max_drawdown', 'max_drawdown_pct')
+    }, index=[f'p{round(q * 100)}' for q in quantiles])
+    table.loc['mean'] = [paths[name].mean() for name in table.columns]
+    table.attrs['ruin_probability'] = float(paths['ruined'].mean())
+    table.attrs['loss_probability'] = float(np.mean(paths['final_pnl'] < 0))
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap or shuffle a strategy's trades into many equity paths.")
+    parser.add_argument('trades_file', help='Trade CSV from a strategy script, or a TradeWriter file')
+    parser.add_argument('--paths', type=int, default=100_000)
+    parser.add_argument('--method', choices=METHODS, default='bootstrap')
+    parser.add_argument('--ruin', type=float, default=0.5, help='Drawdown fraction of the initial balance that counts as ruin')
+    parser.add_argument('--balance', type=float, default=INITIAL_BALANCE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--pip-value', type=float, help='Dollars per pip, for trade files with P/L in pips')
+    args = parser.parse_args()
+
+    # Only the P/L column is loaded from columnar files
+    try:
+        pnl = trade_pnl(read_trades(args.trades_file, columns=[pnl_column(column_names(args.trades_file))]),
+                        pip_value=args.pip_value)
+    except ValueError as e:
+        parser.error(str(e))
+    paths = simulate(pnl, args.paths, args.method, initial_balance=args.balance, ruin_fraction=args.ruin,
+                     seed=args.seed, max_workers=args.workers)
+    table = summarize(paths)
+    print(f"{args.paths:,} {args.method} paths over {len(pnl)} trades")
+    print(table.to_string())
+    print(f"Probability of ruin: {table.attrs['ruin_probability']:.2%}")
+    print(f"Probability of a loss: {table.attrs['loss_probability']:.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import argparse
+
+import numpy as np
+
+import meanReversion
+import rangeTrading
+import swingtradingalgoAA
+from data_loader import load_csv
+from indicators import atr, bollinger_bands, rsi, sma
+from instrumentation import span
+
+# Several strategies over one instrument, sharing the data and indicators.
+#
+# meanReversion, rangeTrading and swingtradingalgoAA each load the same CSV,
+# compute overlapping indicators (RSI-14 twice, ATR-14 twice, SMA50 twice) and
+# then simulate. Here the series is loaded once, every strategy declares the
+# indicators it needs as keys such as ('rsi', 14), and the union of those keys
+# is computed once. Each strategy then runs its own script's simulation over
+# the shared arrays (meanReversion.run_backtest, rangeTrading.run_backtest,
+# swingtradingalgoAA.run_trades), so the rules live only in the scripts and
+# the trades have the same format and values as the scripts'. Only the load
+# and the indicators are shared: every strategy still makes its own pass over
+# the bars, which for these array simulations costs far less than the
+# indicators.
+#
+# check_scripts() (or --check) compares all three with the scripts' own
+# functions on a file.
+
+INDICATORS = {
+    'sma': lambda data, window: sma(data['Close'], window),
+    'rsi': lambda data, period: rsi(data['Close'], period),
+    'atr': lambda data, period: atr(data['High'], data['Low'], data['Close'], period),
+    'bollinger': lambda data, window, num_std: bollinger_bands(data['Close'], window, num_std),
+    'support': lambda data, window: data['Low'].rolling(window=window, center=True).min(),
+    'resistance': lambda data, window: data['High'].rolling(window=window, center=True).max(),
+}
+
+
+def compute_indicators(data, keys):
+    """
+    Compute each distinct indicator key once.
+
+    Args:
+        data (pd.DataFrame): Bars with High, Low and Close columns.
+        keys (iterable): Keys like ('sma', 50); the first item names an INDICATORS entry.
+
+    Returns:
+        dict: key -> float array, or a tuple of arrays for multi-output indicators.
+    """
+    values = {}
+    for key in dict.fromkeys(keys):
+        name, *params = key
+        result = INDICATORS[name](data, *params)
+        if isinstance(result, tuple):
+            values[key] = tuple(np.asarray(part, dtype=float) for part in result)
+        else:
+            values[key] = np.asarray(result, dtype=float)
+    return values
+
+
+class _Paired:
+    # Strategies holding one position at a time, recorded as entry and exit
+    # rows. They run their own module's run_backtest over the shared
+    # indicator arrays, so each strategy's rules exist only in its script.
+
+    def frame(self):
+        trades_df = self.trades.to_frame()
+        trades_df.insert(2, 'date', self.dates.to_numpy()[self.trades['bar']])
+        return trades_df.drop(columns='bar')
+
+    def summary(self):
+        return f"Final Balance: ${self.balance}"
+
+
+class MeanReversion(_Paired):
+    """meanReversion.run_backtest over the shared SMA50 and RSI."""
+
+    name = 'mean_reversion'
+    output_file = 'mean_reversion_trades.csv'
+
+    def __init__(self, stop_loss_pips=10, take_profit_pips=10, pip_size=0.0001, pip_value=10):
+        self.stop_loss_pips = stop_loss_pips
+        self.take_profit_pips = take_profit_pips
+        self.pip_size = pip_size
+        self.pip_value = pip_value
+        self.requires = [('sma', 50), ('rsi', 14)]
+
+    def bind(self, data, indicators):
+        self.dates = data['Date']
+        self.close = data['Close'].to_numpy(dtype=float)
+        self.sma50 = indicators[('sma', 50)]
+        self.rsi = indicators[('rsi', 14)]
+
+    def simulate(self):
+        self.trades, self.balance = meanReversion.run_backtest(
+            self.close, self.sma50, self.rsi, self.stop_loss_pips, self.take_profit_pips, self.pip_size,
+            self.pip_value,
+        )
+
+
+class RangeTrading(_Paired):
+    """rangeTrading.run_backtest over the shared ATR, Bollinger Bands and RSI."""
+
+    name = 'range'
+    output_file = 'low_risk_trades.csv'
+
+    def __init__(self, stop_loss_multiplier=0.5, take_profit_multiplier=0.5, rsi_oversold=30, rsi_overbought=70,
+                 bollinger_window=20, atr_period=14, rsi_period=14, pip_size=0.0001, pip_value=10):
+        self.stop_loss_multiplier = stop_loss_multiplier
+        self.take_profit_multiplier = take_profit_multiplier
+        self.rsi_oversold = rsi_oversold
+        self.rsi_overbought = rsi_overbought
+        self.pip_size = pip_size
+        self.pip_value = pip_value
+        self.requires = [('atr', atr_period), ('bollinger', bollinger_window, 2), ('rsi', rsi_period)]
+
+    def bind(self, data, indicators):
+        atr_key, bollinger_key, rsi_key = self.requires
+        self.dates = data['Date']
+        self.close = data['Close'].to_numpy(dtype=float)
+        self.atr = indicators[atr_key]
+        _, self.upper_band, self.lower_band, _ = indicators[bollinger_key]
+        self.rsi = indicators[rsi_key]
+
+    def simulate(self):
+        self.trades, self.balance = rangeTrading.run_backtest(
+            self.close, self.lower_band, self.upper_band, self.rsi, self.atr, self.stop_loss_multiplier,
+            self.take_profit_multiplier, self.rsi_oversold, self.rsi_overbought, self.pip_size, self.pip_value,
+        )
+
+
+class Swing:
+    """swingtradingalgoAA.run_trades over the shared SMA50, ATR and support/resistance levels."""
+
+    name = 'swing'
+    output_file = 'USDCHF_M30_xsb (1).csvSwing_Trading_Results.csv'
+
+    def __init__(self, pip_value=0.0001, pip_in_dollars=10, spread_pips=1, sma_window=50, atr_period=14,
+                 level_window=14):
+        self.pip_value = pip_value
+        self.pip_in_dollars = pip_in_dollars
+        self.spread = spread_pips * pip_value
+        self.requires = [('sma', sma_window), ('atr', atr_period), ('support', level_window),
+                         ('resistance', level_window)]
+
+    def bind(self, data, indicators):
+        self.data = data
+        self.indicators = [indicators[key] for key in self.requires]
+
+    def simulate(self):
+        sma_values, atr_values, support, resistance = self.indicators
+        self.trades = swingtradingalgoAA.run_trades(
+            self.data['Date'], self.data['Low'], self.data['High'], self.data['Close'], sma_values, atr_values,
+            support, resistance, self.pip_value, self.pip_in_dollars, self.spread,
+        )
+
+    def frame(self):
+        return self.trades.to_frame()
+
+    def summary(self):
+        return f"Trades: {len(self.trades)}"
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (MeanReversion, RangeTrading, Swing)}
+
+
+def load_data(file_path):
+    """Bars sorted by date, with Date kept as a column."""
+    data = load_csv(file_path, parse_dates=['Date'])
+    return data.sort_values('Date').reset_index(drop=True)
+
+
+def run(data, strategies):
+    """
+    Compute the shared indicators once, then simulate each strategy over them.
+
+    Args:
+        data (pd.DataFrame): Bars from load_data.
+        strategies (list): Strategy instances such as MeanReversion().
+
+    Returns:
+        list: The strategies, each holding its `trades`.
+    """
+    with span('indicators'):
+        indicators = compute_indicators(data, [key for strategy in strategies for key in strategy.requires])
+    with span('simulate'):
+        for strategy in strategies:
+            strategy.bind(data, indicators)
+            strategy.simulate()
+    return strategies
+
+
+def check_scripts(file_path):
+    """
+    Compare every strategy's trades with its script's own functions on the same file.
+
+    Returns:
+        dict: Strategy name -> True when the trades are identical.
+    """
+    data = load_data(file_path)
+    runners = {strategy.name: strategy for strategy in run(data, [cls() for cls in STRATEGIES.values()])}
+    results = {}
+
+    df = meanReversion.calculate_indicators(meanReversion.load_data(file_path))
+    trades, balance = meanReversion.run_backtest(df['Close'], df['SMA50'], df['RSI'])
+    results['mean_reversion'] = _same_paired(runners['mean_reversion'], trades, balance)
+
+    df = rangeTrading.calculate_indicators(rangeTrading.load_data(file_path))
+    trades, balance = rangeTrading.run_backtest(df['Close'], df['LowerBand'], df['UpperBand'], df['RSI'], df['ATR'])
+    results['range'] = _same_paired(runners['range'], trades, balance)
+
+    swing = swingtradingalgoAA.load_data(file_path)
+    swing = swingtradingalgoAA.calculate_indicators(swing, legacy_atr=swingtradingalgoAA.legacy_atr)
+    swing = swingtradingalgoAA.find_support_resistance(swing)
+    expected = swingtradingalgoAA.simulate_trades(swing).to_frame()
+    results['swing'] = runners['swing'].frame().astype(object).equals(expected.astype(object))
+    return results
+
+
+def _same_paired(strategy, trades, balance):
+    return strategy.balance == balance and all(
+        np.array_equal(strategy.trades[name], trades[name]) for name in trades.names
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run several strategies over one CSV, loading it and computing indicators once.')
+    parser.add_argument('file_path', nargs='?', default='USDCHF_M30_xsb (1).csv')
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--check', action='store_true', help="Compare every strategy's trades with its script")
+    args = parser.parse_args()
+
+    if args.check:
+        for name, same in check_scripts(args.file_path).items():
+            print(f"{name}: {'identical' if same else 'DIFFERENT'}")
+        return
+
+    with span('load'):
+        data = load_data(args.file_path)
+    strategies = run(data, [STRATEGIES[name]() for name in args.strategies])
+    for strategy in strategies:
+        with span('export'):
+            strategy.frame().to_csv(strategy.output_file, index=False)
+        print(f"{strategy.name}: {strategy.summary()}; trades saved to {strategy.output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# On-disk price history cache keyed by (ticker, interval).
+#
+# Each key is a directory of append-only column files (int64 timestamps plus
+# one float64 file per price column) and a meta.json recording the columns and
+# the contiguous date range already fetched. A request only downloads the part
+# of [start, end) that is missing before or after that range; a tail top-up
+# appends to the column files instead of rewriting them. Days without bars
+# inside the covered range (weekends, holidays) are not fetched again. When a
+# request reaches the present, the range only extends to the start of the last
+# bar returned, since that bar may still be forming; the next top-up downloads
+# it again and replaces it.
+#
+# The cache keeps an index of key sizes and last access times and evicts the
+# least recently used keys once the total size exceeds `max_bytes`.
+
+TIMESTAMP_FILE = 'timestamps.i8'
+
+
+def yfinance_downloader(ticker, start, end, interval):
+    """Download bars with yfinance.download; the default PriceCache downloader."""
+    import yfinance as yf
+
+    return yf.download(ticker, start=start, end=end, interval=interval, progress=False)
+
+
+def _normalize_frame(data):
+    # Flatten yfinance's (Price, Ticker) columns and drop timezones so every
+    # frame is indexed by naive wall-clock timestamps
+    data = data.copy()
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data.index = index.as_unit('ns')
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    return data.select_dtypes('number').astype(float)
+
+
+class PriceCache:
+    """
+    Cache of historical bars that fetches only missing date ranges.
+
+    Args:
+        root (str): Cache directory.
+        max_bytes (int): Size cap; least recently used keys are evicted beyond it.
+        downloader (callable): Called as downloader(ticker, start, end, interval) and
+            returns a DataFrame indexed by timestamp. Defaults to yfinance.
+        clock (callable): Returns the current pd.Timestamp; coverage never extends past it.
+    """
+
+    def __init__(self, root='.price_cache', max_bytes=512 * 1024 ** 2, downloader=yfinance_downloader,
+                 clock=pd.Timestamp.now):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.downloader = downloader
+        self.clock = clock
+        # One lock per key so downloads for different tickers run concurrently;
+        # self.lock guards the shared index and the lock table
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, 'index.json')
+        self.index = self._read_json(self.index_path) or {}
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path, payload):
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    def _key(self, ticker, interval):
+        return f'{interval}/{ticker}'
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _read_columns(self, path, meta):
+        timestamps = np.fromfile(os.path.join(path, TIMESTAMP_FILE), dtype=np.int64)
+        columns = {
+            name: np.fromfile(os.path.join(path, f'{i}.f8'), dtype=np.float64)
+            for i, name in enumerate(meta['columns'])
+        }
+        return timestamps, columns
+
+    def _append(self, path, meta, frame, prepend=False):
+        # Column files are appended to for a tail top-up; a head top-up rewrites
+        # them with the new bars in front
+        frame = frame.reindex(columns=meta['columns'])
+        new = {TIMESTAMP_FILE: frame.index.asi8}
+        new.update({f'{i}.f8': frame[name].to_numpy(dtype=np.float64) for i, name in enumerate(meta['columns'])})
+        for file_name, values in new.items():
+            file_path = os.path.join(path, file_name)
+            if prepend:
+                existing = np.fromfile(file_path, dtype=values.dtype)
+                np.concatenate([values, existing]).tofile(f'{file_path}.tmp')
+                os.replace(f'{file_path}.tmp', file_path)
+            else:
+                with open(file_path, 'ab') as f:
+                    values.tofile(f)
+
+    def _fetch(self, ticker, start, end, interval, downloader):
+        data = downloader(ticker, start.to_pydatetime(), end.to_pydatetime(), interval)
+        if data is None or len(data) == 0:
+            return None
+        data = _normalize_frame(data)
+        return data[(data.index >= start) & (data.index < end)]
+
+    def get(self, ticker, start, end, interval='1d', downloader=None):
+        """
+        Return bars for `ticker` in [start, end), downloading only what is not cached.
+
+        Args:
+            downloader (callable): Overrides the cache's downloader for this call.
+
+        Returns:
+            pd.DataFrame: Bars indexed by timestamp (may be empty).
+        """
+        start, end = pd.Timestamp(start).as_unit('ns'), pd.Timestamp(end).as_unit('ns')
+        downloader = downloader or self.downloader
+        key = self._key(ticker, interval)
+        path = self._path(key)
+        key_lock = self._key_lock(key)
+        with key_lock:
+            meta = self._read_json(os.path.join(path, 'meta.json'))
+            # Bars after "now" cannot exist yet, so they never count as covered
+            now = self.clock().as_unit('ns')
+            fetch_end = min(end, now)
+
+            if meta is None:
+                # New key: start with an empty range and let the tail top-up fill it
+                shutil.rmtree(path, ignore_errors=True)
+                os.makedirs(path)
+                meta = {'columns': [], 'start': start.value, 'end': start.value}
+                self._reset_columns(path, meta)
+
+            covered_start, covered_end = pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+            if start < covered_start:
+                head = self._fetch(ticker, start, covered_start, interval, downloader)
+                if head is not None:
+                    self._store(path, meta, head, prepend=True)
+                meta['start'] = start.value
+            if fetch_end > covered_end:
+                # Bars from covered_end on are stored only while they may still
+                # be forming (see below); the fresh download replaces them
+                self._truncate(path, meta, covered_end)
+                tail = self._fetch(ticker, covered_end, fetch_end, interval, downloader)
+                if tail is not None:
+                    self._store(path, meta, tail)
+                if end < now:
+                    meta['end'] = fetch_end.value
+                elif tail is not None and len(tail):
+                    # The last bar up to now may still be forming, so coverage
+                    # stops at its start and the next call downloads it again
+                    meta['end'] = tail.index[-1].value
+            self._write_json(os.path.join(path, 'meta.json'), meta)
+
+            timestamps, columns = self._read_columns(path, meta)
+            with self.lock:
+                self._touch(key, path)
+                self._evict()
+
+        mask = (timestamps >= start.value) & (timestamps < end.value)
+        frame = pd.DataFrame({name: values[mask] for name, values in columns.items()},
+                             index=pd.DatetimeIndex(timestamps[mask].astype('datetime64[ns]'), name='Date'))
+        return frame
+
+    def _truncate(self, path, meta, before):
+        # Drop stored bars at or after `before` from the end of the column files
+        timestamps = np.fromfile(os.path.join(path, TIMESTAMP_FILE), dtype=np.int64)
+        keep = int(np.searchsorted(timestamps, before.value))
+        if keep == len(timestamps):
+            return
+        for file_name in [TIMESTAMP_FILE] + [f'{i}.f8' for i in range(len(meta['columns']))]:
+            os.truncate(os.path.join(path, file_name), keep * 8)
+
+    def _reset_columns(self, path, meta):
+        for file_name in [TIMESTAMP_FILE] + [f'{i}.f8' for i in range(len(meta['columns']))]:
+            open(os.path.join(path, file_name), 'wb').close()
+
+    def _store(self, path, meta, frame, prepend=False):
+        if not meta['columns']:
+            # The first bars seen for this key fix its column set
+            meta['columns'] = list(frame.columns)
+            self._reset_columns(path, meta)
+        self._append(path, meta, frame, prepend=prepend)
+
+    def _touch(self, key, path):
+        size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        self.index[key] = {'bytes': size, 'last_access': time.time()}
+
+    def _evict(self):
+        total = sum(entry['bytes'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            # Keys being read or topped up by another thread (or this one) stay
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+            if not key_lock.acquire(blocking=False):
+                continue
+            try:
+                total -= self.index.pop(key)['bytes']
+                shutil.rmtree(self._path(key), ignore_errors=True)
+            finally:
+                key_lock.release()
+        self._write_json(self.index_path, self.index)
+
+    def size(self):
+        """Total bytes currently held by the cache."""
+        return sum(entry['bytes'] for entry in self.index.values())
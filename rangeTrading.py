@@ -1,104 +1,158 @@
 import pandas as pd
 import numpy as np
 
+from data_loader import load_csv
+from indicators import atr, bollinger_bands, rsi
+from instrumentation import span
+from ledger import TradeLedger
+from trade_writer import TradeWriter
+
 # Load your CSV data
 def load_data(file_path):
-    df = pd.read_csv(file_path)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df.set_index('Date', inplace=True)
-    return df
+    return load_csv(file_path, parse_dates=['Date'], index_col='Date')
 
 # Calculate indicators
-def calculate_indicators(df):
+def calculate_indicators(df, bollinger_window=20, atr_period=14, rsi_period=14):
     # ATR Calculation
-    df['H-L'] = df['High'] - df['Low']
-    df['H-C'] = abs(df['High'] - df['Close'].shift(1))
-    df['L-C'] = abs(df['Low'] - df['Close'].shift(1))
-    df['TR'] = df[['H-L', 'H-C', 'L-C']].max(axis=1)
-    df['ATR'] = df['TR'].rolling(window=14).mean()
+    df['ATR'] = atr(df['High'], df['Low'], df['Close'], atr_period)
 
     # Bollinger Bands
-    df['SMA20'] = df['Close'].rolling(window=20).mean()
-    df['STD20'] = df['Close'].rolling(window=20).std()
-    df['UpperBand'] = df['SMA20'] + (df['STD20'] * 2)
-    df['LowerBand'] = df['SMA20'] - (df['STD20'] * 2)
+    df['SMA20'], df['UpperBand'], df['LowerBand'], df['STD20'] = bollinger_bands(df['Close'], bollinger_window, 2)
 
     # RSI Calculation
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
+    df['RSI'] = rsi(df['Close'], rsi_period)
 
     return df
 
-# Backtest strategy
-def backtest_strategy(df, stop_loss_multiplier=0.5, take_profit_multiplier=0.5):
-    initial_balance = 10000
-    balance = initial_balance
-    position = 0
-    stop_loss = 0
-    take_profit = 0
-    trades = []
+# Trade rows produced by run_backtest; 'bar' is the positional index of the bar
+TRADE_DTYPE = np.dtype([('type', 'U4'), ('price', 'f8'), ('bar', 'i8'), ('profit_loss', 'f8')])
+
+# Trade rows when run_backtest is given the bar dates, as written to the CSV
+def dated_fields(dates):
+    return [('type', 'U4'), ('price', 'f8'), ('date', np.asarray(dates).dtype), ('profit_loss', 'f8')]
+
+# Run the strategy over plain arrays; no printing or file output so it can be
+# called many times from a parameter sweep
+def run_backtest(close, lower_band, upper_band, rsi, atr, stop_loss_multiplier=0.5, take_profit_multiplier=0.5,
+                 rsi_oversold=30, rsi_overbought=70, pip_size=0.0001, pip_value=10, start=1, state=None, trades=None,
+                 dates=None):
+    """
+    Simulate the range strategy bar by bar.
+
+    A run can be split over consecutive chunks of bars by passing the same
+    `state` dict to each call; it carries the balance and any open position.
+
+    Args:
+        close, lower_band, upper_band, rsi, atr (array-like): Aligned indicator columns.
+        stop_loss_multiplier (float): Stop loss distance in ATRs.
+        take_profit_multiplier (float): Take profit distance in ATRs.
+        rsi_oversold (float): RSI below which a long can open at the lower band.
+        rsi_overbought (float): RSI above which a short can open at the upper band.
+        pip_size (float): Price change of one pip.
+        pip_value (float): Dollar value of one pip.
+        start (int): First bar to trade; earlier bars only warm up the indicators.
+        state (dict): Position state, updated in place when the call returns.
+        trades (TradeLedger): Ledger to append to, or a TradeWriter to stream
+            the rows to a file; its last row must be the entry of the open
+            position carried in `state`, if any.
+        dates (array-like): Bar dates; if given, rows hold the bar's date
+            instead of its position (dated_fields() instead of TRADE_DTYPE).
 
-    for i in range(1, len(df)):
+    Returns:
+        tuple: (trades, balance) where trades holds one row per entry and exit.
+    """
+    close = np.asarray(close, dtype=float).tolist()
+    lower_band = np.asarray(lower_band, dtype=float).tolist()
+    upper_band = np.asarray(upper_band, dtype=float).tolist()
+    rsi = np.asarray(rsi, dtype=float).tolist()
+    atr = np.asarray(atr, dtype=float).tolist()
+
+    state = {} if state is None else state
+    balance = state.get('balance', 10000)
+    position = state.get('position', 0)
+    entry_price = state.get('entry_price', 0)
+    stop_loss = state.get('stop_loss', 0)
+    take_profit = state.get('take_profit', 0)
+    stamps = range(len(close)) if dates is None else np.asarray(dates)
+    if trades is None:
+        trades = TradeLedger(TRADE_DTYPE if dates is None else dated_fields(stamps))
+
+    for i in range(start, len(close)):
+        price = close[i]
         # Check for entry
         if position == 0:
-            if (
-                df['Close'].iloc[i] <= df['LowerBand'].iloc[i] and
-                df['RSI'].iloc[i] < 30
-            ):
+            if price <= lower_band[i] and rsi[i] < rsi_oversold:
                 position = 1  # Long position
-                entry_price = df['Close'].iloc[i]
-                stop_loss = entry_price - (stop_loss_multiplier * df['ATR'].iloc[i])
-                take_profit = entry_price + (take_profit_multiplier * df['ATR'].iloc[i])
-                trades.append({'type': 'buy', 'price': entry_price, 'date': df.index[i], 'profit_loss': 0})
-
-            elif (
-                df['Close'].iloc[i] >= df['UpperBand'].iloc[i] and
-                df['RSI'].iloc[i] > 70
-            ):
+                entry_price = price
+                stop_loss = entry_price - (stop_loss_multiplier * atr[i])
+                take_profit = entry_price + (take_profit_multiplier * atr[i])
+                trades.append('buy', entry_price, stamps[i], 0)
+
+            elif price >= upper_band[i] and rsi[i] > rsi_overbought:
                 position = -1  # Short position
-                entry_price = df['Close'].iloc[i]
-                stop_loss = entry_price + (stop_loss_multiplier * df['ATR'].iloc[i])
-                take_profit = entry_price - (take_profit_multiplier * df['ATR'].iloc[i])
-                trades.append({'type': 'sell', 'price': entry_price, 'date': df.index[i], 'profit_loss': 0})
+                entry_price = price
+                stop_loss = entry_price + (stop_loss_multiplier * atr[i])
+                take_profit = entry_price - (take_profit_multiplier * atr[i])
+                trades.append('sell', entry_price, stamps[i], 0)
 
         # Check for exit
         elif position == 1:
-            if df['Close'].iloc[i] <= stop_loss or df['Close'].iloc[i] >= take_profit:
-                profit_loss = (df['Close'].iloc[i] - entry_price) / 0.0001 * 10
+            if price <= stop_loss or price >= take_profit:
+                profit_loss = (price - entry_price) / pip_size * pip_value
                 balance += profit_loss
-                trades[-1]['profit_loss'] = profit_loss
+                trades.update_last(profit_loss=profit_loss)
                 position = 0
-                trades.append({'type': 'sell', 'price': df['Close'].iloc[i], 'date': df.index[i], 'profit_loss': profit_loss})
+                trades.append('sell', price, stamps[i], profit_loss)
 
         elif position == -1:
-            if df['Close'].iloc[i] >= stop_loss or df['Close'].iloc[i] <= take_profit:
-                profit_loss = (entry_price - df['Close'].iloc[i]) / 0.0001 * 10
+            if price >= stop_loss or price <= take_profit:
+                profit_loss = (entry_price - price) / pip_size * pip_value
                 balance += profit_loss
-                trades[-1]['profit_loss'] = profit_loss
+                trades.update_last(profit_loss=profit_loss)
                 position = 0
-                trades.append({'type': 'buy', 'price': df['Close'].iloc[i], 'date': df.index[i], 'profit_loss': profit_loss})
+                trades.append('buy', price, stamps[i], profit_loss)
+
+    state.update(balance=balance, position=position, entry_price=entry_price, stop_loss=stop_loss,
+                 take_profit=take_profit)
+    return trades, balance
+
+# Backtest strategy
+def backtest_strategy(df, stop_loss_multiplier=0.5, take_profit_multiplier=0.5, rsi_oversold=30, rsi_overbought=70,
+                      verbose=True, output_file='low_risk_trades.csv'):
+    initial_balance = 10000
+    # Trades are written to the CSV in batches while the backtest runs
+    if output_file is not None:
+        trades = TradeWriter(output_file, dated_fields(df.index))
+    else:
+        trades = TradeLedger(dated_fields(df.index))
+    with span('simulate'):
+        _, balance = run_backtest(
+            df['Close'], df['LowerBand'], df['UpperBand'], df['RSI'], df['ATR'],
+            stop_loss_multiplier, take_profit_multiplier, rsi_oversold, rsi_overbought, trades=trades,
+            dates=df.index,
+        )
+    if output_file is not None:
+        trades.close()
 
     # Summary
     profit = balance - initial_balance
-    print(f"Initial Balance: ${initial_balance}")
-    print(f"Final Balance: ${balance}")
-    print(f"Net Profit: ${profit}")
+    if verbose:
+        print(f"Initial Balance: ${initial_balance}")
+        print(f"Final Balance: ${balance}")
+        print(f"Net Profit: ${profit}")
 
-    # Save trades to CSV
-    trades_df = pd.DataFrame(trades)
-    trades_df.to_csv('low_risk_trades.csv', index=False)
-    print("Trades saved to low_risk_trades.csv")
+    if output_file is not None and verbose:
+        print(f"Trades saved to {output_file}")
 
     return trades
 
 # Main function
 def main():
     file_path = 'USDCHF_M30_xsb (1).csv'  # Replace with your file path
-    df = load_data(file_path)
-    df = calculate_indicators(df)
+    with span('load'):
+        df = load_data(file_path)
+    with span('indicators'):
+        df = calculate_indicators(df)
     backtest_strategy(df)
 
 if __name__ == "__main__":
@@ -0,0 +1,217 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_csv
+from ledger import TradeLedger
+
+# Higher timeframes built from the finest bars available.
+#
+# Every bar gets an integer bucket id, its wall-clock time divided by the
+# bucket length, so buckets are aligned to midnight: D1 buckets start at local
+# midnight and H4 buckets at 00:00, 04:00, ... local time, on both sides of a
+# DST change. Naive timestamps are taken as wall-clock time as they are.
+# Bucket boundaries are where the id changes, and each OHLCV column is
+# aggregated over all buckets at once with np.*.reduceat. NaN is skipped like
+# pandas first/max/min/last/sum: first valid open, highest high, lowest low,
+# last valid close, summed volume. Bucket starts are stored as UTC instants
+# and returned in the input's timezone.
+#
+# Each derived timeframe is cached after it is first built. Appending new
+# base bars only re-aggregates the bars of each cached timeframe's trailing
+# bucket (which may still be growing) plus the new ones, so keeping many
+# timeframes current costs about the size of the update rather than the
+# history.
+
+TIMEFRAMES = {
+    'M1': 60,
+    'M5': 5 * 60,
+    'M15': 15 * 60,
+    'M30': 30 * 60,
+    'H1': 60 * 60,
+    'H4': 4 * 60 * 60,
+    'D1': 24 * 60 * 60,
+}
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _step_ns(timeframe):
+    seconds = TIMEFRAMES[timeframe] if isinstance(timeframe, str) else int(timeframe)
+    return seconds * 1_000_000_000
+
+
+def _first_valid(values, starts, ends):
+    # Value at the first non-NaN position of each bucket, NaN if there is none
+    n = len(values)
+    positions = np.where(np.isnan(values), n, np.arange(n))
+    first = np.minimum.reduceat(positions, starts)
+    return np.where(first < ends, values[np.minimum(first, n - 1)], np.nan)
+
+
+def _last_valid(values, starts):
+    positions = np.where(np.isnan(values), -1, np.arange(len(values)))
+    last = np.maximum.reduceat(positions, starts)
+    return np.where(last >= starts, values[last], np.nan)
+
+
+def _wall_clock(timestamps, tz):
+    # UTC nanoseconds -> local wall-clock nanoseconds
+    if tz is None:
+        return timestamps
+    return pd.DatetimeIndex(timestamps.view('M8[ns]')).tz_localize('UTC').tz_convert(tz).tz_localize(None).asi8
+
+
+def aggregate(timestamps, columns, step, tz=None):
+    """
+    OHLCV buckets of length `step` nanoseconds of wall-clock time.
+
+    Args:
+        timestamps (np.ndarray): Sorted int64 nanosecond bar times, UTC when `tz` is set.
+        columns (dict): Open/High/Low/Close and optionally Volume arrays.
+        step (int): Bucket length in nanoseconds.
+        tz: Timezone whose wall clock the buckets follow; None for naive times.
+
+    Returns:
+        dict: 'Date' (bucket start, int64 ns, UTC when `tz` is set) and one
+        array per input column.
+    """
+    if len(timestamps) == 0:
+        return {'Date': timestamps[:0], **{name: values[:0] for name, values in columns.items()}}
+    wall_clock = _wall_clock(timestamps, tz)
+    ids = wall_clock // step
+    offset = timestamps - wall_clock
+    # A UTC offset change at least a bucket long (the repeated hour when DST
+    # ends, for H1 and shorter) also starts a new bucket, as in pandas
+    boundaries = (np.diff(ids) != 0) | (np.abs(np.diff(offset)) >= step)
+    starts = np.concatenate(([0], np.flatnonzero(boundaries) + 1))
+    ends = np.concatenate((starts[1:], [len(ids)]))
+    bucket_starts = ids[starts] * step
+    if tz is not None:
+        # Back to UTC; a start skipped by DST moves to the change, and one on
+        # a repeated hour takes the UTC offset of the bucket's first bar
+        local = pd.DatetimeIndex(bucket_starts.view('M8[ns]')).tz_localize(
+            tz, ambiguous='NaT', nonexistent='shift_forward'
+        )
+        bucket_starts = np.where(
+            local.isna(), bucket_starts + offset[starts], local.tz_convert('UTC').tz_localize(None).as_unit('ns').asi8
+        )
+    buckets = {'Date': bucket_starts}
+    for name, values in columns.items():
+        floats = values.dtype.kind == 'f'
+        if name == 'Open':
+            buckets[name] = _first_valid(values, starts, ends) if floats else values[starts]
+        elif name == 'Close':
+            buckets[name] = _last_valid(values, starts) if floats else values[ends - 1]
+        elif name == 'High':
+            buckets[name] = np.fmax.reduceat(values, starts)
+        elif name == 'Low':
+            buckets[name] = np.fmin.reduceat(values, starts)
+        else:
+            buckets[name] = np.add.reduceat(np.where(np.isnan(values), 0, values) if floats else values, starts)
+    return buckets
+
+
+class Resampler:
+    """
+    Base bars plus cached higher timeframes, kept current by append().
+
+    Args:
+        data (pd.DataFrame): Bars with a Date column (or a DatetimeIndex) and
+            Open, High, Low, Close and optionally Volume columns, sorted by date.
+    """
+
+    def __init__(self, data):
+        if 'Date' not in data.columns:
+            data = data.rename_axis('Date').reset_index()
+        self.tz = pd.DatetimeIndex(data['Date']).tz
+        names = [name for name in OHLCV if name in data.columns]
+        self.base = TradeLedger([('Date', 'i8')] + [(name, data[name].dtype) for name in names],
+                                capacity=len(data))
+        self._cache = {}
+        self.append(data)
+
+    @classmethod
+    def from_csv(cls, file_path, **load_kwargs):
+        """Resampler over a broker CSV loaded through data_loader.load_csv."""
+        return cls(load_csv(file_path, parse_dates=['Date'], **load_kwargs))
+
+    @property
+    def columns(self):
+        return [name for name in self.base.names if name != 'Date']
+
+    def append(self, bars):
+        """
+        Add bars later than the last one and update every cached timeframe.
+
+        Args:
+            bars (pd.DataFrame): New bars in the same layout as the constructor's.
+        """
+        if 'Date' not in bars.columns:
+            bars = bars.rename_axis('Date').reset_index()
+        dates = pd.DatetimeIndex(bars['Date'])
+        if str(dates.tz) != str(self.tz):
+            raise ValueError(f"Appended bars are in timezone {dates.tz}, expected {self.tz}.")
+        timestamps = dates.as_unit('ns').asi8
+        if len(timestamps) == 0:
+            return
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError("Bars must be sorted by date.")
+        if len(self.base) and timestamps[0] <= self.base['Date'][-1]:
+            raise ValueError("Appended bars must be later than the last bar.")
+        self.base.extend({'Date': timestamps, **{name: bars[name].to_numpy() for name in self.columns}})
+
+        for step, buckets in self._cache.items():
+            # Re-aggregate from the start of the trailing bucket, which the
+            # new bars may extend, and replace it with the result
+            from_bucket = buckets['Date'][-1] if len(buckets) else self.base['Date'][0]
+            first = int(np.searchsorted(self.base['Date'], from_bucket))
+            tail = aggregate(
+                self.base['Date'][first:], {name: self.base[name][first:] for name in self.columns}, step, self.tz
+            )
+            if len(buckets):
+                buckets.update_last(**{name: values[0] for name, values in tail.items()})
+                tail = {name: values[1:] for name, values in tail.items()}
+            buckets.extend(tail)
+
+    def _buckets(self, timeframe):
+        step = _step_ns(timeframe)
+        if step not in self._cache:
+            buckets = TradeLedger(self.base.dtype)
+            buckets.extend(aggregate(self.base['Date'], {name: self.base[name] for name in self.columns}, step, self.tz))
+            self._cache[step] = buckets
+        return self._cache[step]
+
+    def frame(self, timeframe):
+        """
+        Bars of `timeframe` ('M5', 'H1', 'D1', ... or seconds), built once and cached.
+
+        Returns:
+            pd.DataFrame: Date (bucket start) and OHLCV columns, like the broker CSVs.
+        """
+        buckets = self._buckets(timeframe)
+        data = buckets.to_frame(copy=True)
+        dates = pd.DatetimeIndex(data['Date'].to_numpy().view('M8[ns]'))
+        data['Date'] = dates if self.tz is None else dates.tz_localize('UTC').tz_convert(self.tz)
+        return data
+
+    def to_csv(self, timeframe, path):
+        """Write `timeframe` as a CSV in the broker layout the strategy scripts load."""
+        self.frame(timeframe).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resample a bar CSV to a higher timeframe.')
+    parser.add_argument('file_path')
+    parser.add_argument('timeframe', choices=list(TIMEFRAMES))
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    resampler = Resampler.from_csv(args.file_path)
+    resampler.to_csv(args.timeframe, args.output)
+    print(f"{len(resampler.base)} bars resampled to {args.timeframe}; saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Hand large read-only arrays to worker processes without pickling them.
+#
+# The parent writes each array once as a .npy file in a scratch directory and
+# passes only the small `spec` to the workers, which open the files
+# memory-mapped. Every process then reads the same pages from the OS cache.
+
+
+class SharedArrays:
+    """
+    Publish named arrays to worker processes as memory-mapped .npy files.
+
+    Use as a context manager; the scratch directory is removed on exit.
+
+    Args:
+        arrays (dict): Mapping of name -> array-like.
+        directory (str): Parent directory for the scratch files. Defaults to the system temp dir.
+    """
+
+    def __init__(self, arrays, directory=None):
+        self.path = tempfile.mkdtemp(prefix='shared_arrays_', dir=directory)
+        self.names = []
+        for name, values in arrays.items():
+            np.save(os.path.join(self.path, f'{len(self.names)}.npy'), np.asarray(values))
+            self.names.append(name)
+
+    @property
+    def spec(self):
+        """Picklable description of the arrays, passed to `attach` in the workers."""
+        return self.path, tuple(self.names)
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """Open the arrays described by `SharedArrays.spec` read-only and memory-mapped."""
+    path, names = spec
+    return {name: np.load(os.path.join(path, f'{i}.npy'), mmap_mode='r') for i, name in enumerate(names)}
@@ -0,0 +1,274 @@
+import csv
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Concurrent, rate-limited and resumable fetching of per-ticker company data.
+#
+# Replaces the notebook's serial loop (and its manual restart from a hardcoded
+# ticker) with a small thread pool that shares one token-bucket rate limiter.
+# Every request is retried with exponential backoff. Each finished ticker is
+# appended to the output CSV and to a checkpoint file straight away, so an
+# interrupted run picks up where it stopped when started again.
+#
+# All Yahoo Finance access goes through a `client` object exposing
+# `Ticker(symbol)`; it defaults to the yfinance module, and StubClient serves
+# canned data for running the pipeline offline.
+
+SUMMARY_FIELDS = [
+    "Ticker", "Name", "Sector", "Industry", "Recent_Close", "Recent_Date",
+    "Six_Months_Close", "Six_Months_Date", "PE_Ratio", "EPS", "Dividend_Yield",
+]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+def retry_with_backoff(func, retry_limit=3, delay=2, max_delay=60, on_retry=None, sleep=time.sleep):
+    """
+    Call `func()` and retry failures with exponential backoff and jitter.
+
+    Args:
+        func (callable): Function to call without arguments.
+        retry_limit (int): Total number of attempts.
+        delay (float): Delay in seconds before the first retry; doubled after each failure.
+        max_delay (float): Upper bound on a single delay.
+        on_retry (callable): Called as on_retry(attempt, error, wait) before each retry.
+        sleep (callable): Sleep function, replaceable in tests.
+
+    Returns:
+        The return value of `func`. The last exception is re-raised once all attempts fail.
+    """
+    for attempt in range(retry_limit):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == retry_limit - 1:
+                raise
+            wait = min(max_delay, delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if on_retry is not None:
+                on_retry(attempt + 1, e, wait)
+            sleep(wait)
+
+
+def _default_client():
+    import yfinance as yf
+
+    return yf
+
+
+def fetch_company_summary(ticker, client=None, limiter=None, days=180, cache=None):
+    """
+    Fetch six months of closes and company metadata for one ticker.
+
+    Args:
+        cache (PriceCache): When given, closes come from the cache and only the
+            bars it is missing are downloaded.
+
+    Returns:
+        dict: One row of SUMMARY_FIELDS, or None when the ticker has no price history.
+    """
+    client = client or _default_client()
+    stock = client.Ticker(ticker)
+
+    # Define the date range
+    end_date = datetime.today()
+    start_date = end_date - timedelta(days=days)
+
+    def download(ticker, start, end, interval):
+        if limiter is not None:
+            limiter.acquire()
+        return stock.history(start=start, end=end, interval=interval)
+
+    if cache is not None:
+        historical_data = cache.get(ticker, start_date, end_date, "1d", downloader=download)
+    else:
+        historical_data = download(ticker, start_date, end_date, "1d")
+    if historical_data is None or historical_data.empty:
+        return None
+
+    if limiter is not None:
+        limiter.acquire()
+    info = stock.info
+
+    return {
+        "Ticker": ticker,
+        "Name": info.get("shortName", "N/A"),
+        "Sector": info.get("sector", "N/A"),
+        "Industry": info.get("industry", "N/A"),
+        "Recent_Close": historical_data["Close"].iloc[-1],
+        "Recent_Date": historical_data.index[-1].strftime('%Y-%m-%d'),
+        "Six_Months_Close": historical_data["Close"].iloc[0],
+        "Six_Months_Date": historical_data.index[0].strftime('%Y-%m-%d'),
+        "PE_Ratio": info.get("trailingPE", "N/A"),
+        "EPS": info.get("trailingEps", "N/A"),
+        "Dividend_Yield": info.get("dividendYield", "N/A"),
+    }
+
+
+def _load_checkpoint(checkpoint_file, output_file):
+    # Tickers finished in earlier runs: anything recorded as ok/empty in the
+    # checkpoint, plus anything already written to the output file
+    finished = set()
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line
+                if entry.get("status") in ("ok", "empty"):
+                    finished.add(entry["ticker"])
+    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+        finished.update(pd.read_csv(output_file, usecols=["Ticker"])["Ticker"].astype(str))
+    return finished
+
+
+def run_fetch(tickers, output_file, checkpoint_file=None, client=None, max_workers=4, rate=2.0, burst=4,
+              retry_limit=4, delay=2, cache=None, fetch=fetch_company_summary):
+    """
+    Fetch company summaries for `tickers`, resuming from earlier runs.
+
+    Args:
+        tickers (list): Ticker symbols to fetch.
+        output_file (str): CSV that rows are appended to as they finish.
+        checkpoint_file (str): JSON-lines progress log. Defaults to `output_file` + '.checkpoint'.
+        client: Object exposing `Ticker(symbol)`; defaults to yfinance.
+        max_workers (int): Concurrent fetch threads.
+        rate (float): Requests per second across all threads.
+        burst (int): Requests allowed back to back before the rate applies.
+        retry_limit (int): Attempts per ticker.
+        delay (float): First backoff delay in seconds.
+        cache (PriceCache): Shared price history cache, so repeated runs only download new bars.
+        fetch (callable): Called as fetch(ticker, client, limiter) to produce a row, with
+            cache=cache added when a cache is given.
+
+    Returns:
+        dict: Counts of tickers per status ('ok', 'empty', 'failed', 'skipped').
+    """
+    checkpoint_file = checkpoint_file or f"{output_file}.checkpoint"
+    client = client or _default_client()
+    limiter = TokenBucket(rate, burst)
+
+    finished = _load_checkpoint(checkpoint_file, output_file)
+    remaining = [ticker for ticker in dict.fromkeys(tickers) if ticker not in finished]
+    counts = {"ok": 0, "empty": 0, "failed": 0, "skipped": len(tickers) - len(remaining)}
+    if not remaining:
+        print("All tickers already fetched.")
+        return counts
+
+    # Custom fetch functions written without a cache argument keep working
+    fetch_kwargs = {} if cache is None else {"cache": cache}
+
+    def fetch_one(ticker):
+        return retry_with_backoff(
+            lambda: fetch(ticker, client, limiter, **fetch_kwargs),
+            retry_limit=retry_limit,
+            delay=delay,
+            on_retry=lambda attempt, e, wait: print(f"Error fetching {ticker} ({e}); retrying in {wait:.1f}s..."),
+        )
+
+    write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    with open(output_file, "a", newline="") as out, open(checkpoint_file, "a") as log, \
+            ThreadPoolExecutor(max_workers) as executor:
+        writer = csv.DictWriter(out, fieldnames=SUMMARY_FIELDS)
+        if write_header:
+            writer.writeheader()
+        futures = {executor.submit(fetch_one, ticker): ticker for ticker in remaining}
+        # Results are written from this thread only, so no locking is needed
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                status = "failed"
+                print(f"Error fetching data for {ticker}: {e}")
+            else:
+                status = "ok" if row else "empty"
+                if row:
+                    writer.writerow(row)
+                    out.flush()
+                else:
+                    print(f"No historical data for {ticker}")
+            log.write(json.dumps({"ticker": ticker, "status": status}) + "\n")
+            log.flush()
+            counts[status] += 1
+            print(f"Processed {ticker}: {status}")
+
+    print(f"Data for {counts['ok']} companies saved to {output_file}")
+    return counts
+
+
+class StubClient:
+    """
+    Offline stand-in for the yfinance module.
+
+    Args:
+        history (dict): Ticker -> DataFrame with a DatetimeIndex and a 'Close' column.
+        info (dict): Ticker -> info dict.
+        failures (dict): Ticker -> number of calls that raise before succeeding.
+    """
+
+    def __init__(self, history, info=None, failures=None):
+        self.history = history
+        self.info = info or {}
+        self.failures = dict(failures or {})
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def Ticker(self, ticker):
+        return _StubTicker(self, ticker)
+
+
+class _StubTicker:
+    def __init__(self, client, ticker):
+        self.client = client
+        self.ticker = ticker
+
+    def history(self, start=None, end=None, interval="1d", period=None):
+        with self.client.lock:
+            self.client.calls.append(("history", self.ticker))
+            if self.client.failures.get(self.ticker, 0) > 0:
+                self.client.failures[self.ticker] -= 1
+                raise ConnectionError(f"stub failure for {self.ticker}")
+        data = self.client.history.get(self.ticker, pd.DataFrame(columns=["Close"]))
+        if start is not None and not data.empty:
+            data = data[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))]
+        return data
+
+    @property
+    def info(self):
+        with self.client.lock:
+            self.client.calls.append(("info", self.ticker))
+        return self.client.info.get(self.ticker, {})
@@ -0,0 +1,179 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from indicators import atr, bollinger_bands, rsi
+from metrics import bars_per_year, evaluate, round_trips
+from rangeTrading import run_backtest
+from shared_arrays import SharedArrays, attach
+from trade_writer import TradeWriter
+
+# Parameter sweeps for rangeTrading's strategy.
+#
+# The indicator columns every combination needs (one Bollinger pair per
+# window, one ATR per period, one RSI) are computed once in the parent and
+# shared with the worker processes through memory-mapped arrays. Workers only
+# receive parameter dicts and return small result rows, which can be streamed
+# to a file as they arrive instead of collected (see run_sweep's `output`).
+
+DEFAULT_PARAMS = {
+    'bollinger_window': 20,
+    'atr_period': 14,
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'stop_loss_multiplier': 0.5,
+    'take_profit_multiplier': 0.5,
+}
+
+INITIAL_BALANCE = 10000
+
+# Mark-to-market metrics from metrics.evaluate added to every result row
+RISK_METRICS = ['max_drawdown', 'sharpe', 'sortino', 'expectancy', 'profit_factor', 'exposure']
+
+# Arrays attached in each worker process by _init_worker
+_columns = None
+
+
+def _init_worker(spec):
+    global _columns
+    _columns = attach(spec)
+
+
+def _evaluate(params, columns, periods_per_year):
+    window, period = params['bollinger_window'], params['atr_period']
+    trades, balance = run_backtest(
+        columns['close'], columns[f'lower_{window}'], columns[f'upper_{window}'], columns['rsi'],
+        columns[f'atr_{period}'], params['stop_loss_multiplier'], params['take_profit_multiplier'],
+        params['rsi_oversold'], params['rsi_overbought'],
+    )
+    # Exit rows carry the realised P/L of each round trip
+    exits = trades['profit_loss'][1::2].tolist()
+    wins = sum(1 for profit_loss in exits if profit_loss > 0)
+    _, metrics = evaluate(columns['close'], round_trips(trades), periods_per_year, initial_balance=INITIAL_BALANCE)
+    return {
+        **params,
+        'net_profit': balance - INITIAL_BALANCE,
+        'final_balance': balance,
+        'trades': len(exits),
+        'win_rate': wins / len(exits) if exits else np.nan,
+        **{name: metrics[name] for name in RISK_METRICS},
+    }
+
+
+def _evaluate_chunk(task):
+    chunk, periods_per_year = task
+    return [_evaluate(params, _columns, periods_per_year) for params in chunk]
+
+
+def _indicator_columns(df, combinations):
+    high, low, close = df['High'], df['Low'], df['Close']
+    columns = {'close': close.to_numpy(dtype=float), 'rsi': rsi(close, 14)}
+    for window in sorted({params['bollinger_window'] for params in combinations}):
+        _, columns[f'upper_{window}'], columns[f'lower_{window}'], _ = bollinger_bands(close, window, 2)
+    for period in sorted({params['atr_period'] for params in combinations}):
+        columns[f'atr_{period}'] = atr(high, low, close, period)
+    return columns
+
+
+def _result_fields(combinations):
+    # Parameter dtypes come from all combinations so no chunk is truncated
+    params = [(name, np.asarray([params[name] for params in combinations]).dtype) for name in combinations[0]]
+    return params + [('net_profit', 'f8'), ('final_balance', 'f8'), ('trades', 'i8'), ('win_rate', 'f8')] + [
+        (name, 'f8') for name in RISK_METRICS
+    ]
+
+
+def run_sweep(df, combinations, max_workers=None, chunk_size=None, output=None, periods_per_year=None):
+    """
+    Evaluate parameter combinations for rangeTrading's strategy on a process pool.
+
+    Args:
+        df (pd.DataFrame): OHLC frame with 'High', 'Low' and 'Close' columns.
+        combinations (list): Parameter dicts; missing keys fall back to DEFAULT_PARAMS.
+        max_workers (int): Worker processes. Defaults to the CPU count.
+        chunk_size (int): Combinations sent to a worker per task.
+        output (str): If given, result rows are written there through a
+            TradeWriter as chunks finish, in combination order, instead of
+            being kept in memory.
+        periods_per_year (float): Bars per year for annualising Sharpe and
+            Sortino. Inferred from the frame's DatetimeIndex by default.
+
+    Returns:
+        pd.DataFrame: One row per combination, ranked by net profit. With
+        `output`, the number of rows written instead.
+    """
+    combinations = [{**DEFAULT_PARAMS, **params} for params in combinations]
+    if not combinations:
+        if output is not None:
+            return 0
+        return pd.DataFrame(columns=[*DEFAULT_PARAMS, 'net_profit', 'final_balance', 'trades', 'win_rate', *RISK_METRICS])
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, len(combinations) // (max_workers * 4))
+    if periods_per_year is None:
+        periods_per_year = bars_per_year(df.index)
+    chunks = [(combinations[i:i + chunk_size], periods_per_year) for i in range(0, len(combinations), chunk_size)]
+
+    with SharedArrays(_indicator_columns(df, combinations)) as shared:
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(shared.spec,)) as executor:
+            if output is not None:
+                fields = _result_fields(combinations)
+                with TradeWriter(output, fields) as writer:
+                    for rows in executor.map(_evaluate_chunk, chunks):
+                        writer.extend({name: [row[name] for row in rows] for name, _ in fields})
+                return len(writer)
+            results = [row for rows in executor.map(_evaluate_chunk, chunks) for row in rows]
+
+    table = pd.DataFrame(results)
+    return table.sort_values('net_profit', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def grid_search(df, param_grid, **kwargs):
+    """
+    Evaluate every combination in `param_grid`, a mapping of parameter name -> list of values.
+
+    Returns:
+        pd.DataFrame: Results ranked by net profit (see run_sweep).
+    """
+    names = list(param_grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    return run_sweep(df, combinations, **kwargs)
+
+
+def random_search(df, param_space, n_iter, seed=None, **kwargs):
+    """
+    Evaluate `n_iter` distinct combinations drawn uniformly from `param_space`,
+    a mapping of parameter name -> list of candidate values.
+
+    Returns:
+        pd.DataFrame: Results ranked by net profit (see run_sweep).
+    """
+    rng = np.random.default_rng(seed)
+    names = list(param_space)
+    total = int(np.prod([len(values) for values in param_space.values()]))
+    picks = rng.choice(total, size=min(n_iter, total), replace=False)
+    # Decode each flat pick into one value per parameter
+    combinations = []
+    for pick in picks.tolist():
+        params = {}
+        for name in reversed(names):
+            pick, offset = divmod(pick, len(param_space[name]))
+            params[name] = param_space[name][offset]
+        combinations.append({name: params[name] for name in names})
+    return run_sweep(df, combinations, **kwargs)
+
+
+if __name__ == '__main__':
+    from rangeTrading import load_data
+
+    df = load_data('USDCHF_M30_xsb (1).csv')
+    results = grid_search(df, {
+        'bollinger_window': [15, 20, 30],
+        'atr_period': [10, 14, 20],
+        'stop_loss_multiplier': [0.5, 1.0, 1.5],
+        'take_profit_multiplier': [0.5, 1.0, 2.0],
+    })
+    print(results.head(20).to_string())
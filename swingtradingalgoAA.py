@@ -1,40 +1,37 @@
 import pandas as pd
 import numpy as np
 
+from barriers import BarrierIndex, first_barrier_hits
+from data_loader import load_csv
+from indicators import atr, sma
+from instrumentation import span
+from ledger import TradeLedger
+from trade_writer import TradeWriter
+
 # Read historical data from the CSV file
-data = pd.read_csv("USDCHF_M30_xsb (1).csv")
+def load_data(file_path):
+    data = load_csv(file_path, parse_dates=["Date"])
+
+    # Ensure the data is sorted by date
+    data.sort_values("Date", inplace=True)
+    return data
 
-# Ensure the data has proper datetime and sorting
-data["Date"] = pd.to_datetime(data["Date"])
-data.sort_values("Date", inplace=True)
+# Set to True to reproduce the original ATR, which measured the true range
+# against the current bar's close instead of the previous one
+legacy_atr = False
 
 # Calculate moving averages and ATR for trend filtering and dynamic levels
-def calculate_indicators(data):
-    data["SMA_50"] = data["Close"].rolling(window=50).mean()
-    data["ATR"] = (
-        data[["High", "Low", "Close"]].apply(lambda x: max(x[0] - x[1], abs(x[0] - x[2]), abs(x[1] - x[2])), axis=1)
-        .rolling(window=14)
-        .mean()
-    )
+def calculate_indicators(data, legacy_atr=False):
+    data["SMA_50"] = sma(data["Close"], 50)
+    data["ATR"] = atr(data["High"], data["Low"], data["Close"], 14, legacy=legacy_atr)
     return data
 
-data = calculate_indicators(data)
-
 # Identify support and resistance levels using a rolling window
 def find_support_resistance(data, window=14):
     data["Support"] = data["Low"].rolling(window=window, center=True).min()
     data["Resistance"] = data["High"].rolling(window=window, center=True).max()
     return data
 
-data = find_support_resistance(data)
-
-# Initialize columns for trades
-data["Type"] = None
-data["Entry"] = None
-data["Stop Loss"] = None
-data["Take Profit"] = None
-data["Profit/Loss ($)"] = None
-
 # Define pip value and account settings
 pip_value = 0.0001  # 1 pip = 0.0001 for EUR/USD
 pip_in_dollars = 10  # 1 pip = $10 per standard lot
@@ -42,79 +39,90 @@ account_balance = 10000  # Starting account balance in dollars
 risk_per_trade = 0.01  # Risk 1% of account balance per trade
 spread = 1 * pip_value  # Fixed spread of 1 pip
 
+# Trade rows produced by run_trades
+def trade_fields(date_dtype):
+    return [
+        ("Date", date_dtype), ("Type", "U4"), ("Entry", "f8"), ("Stop Loss", "f8"),
+        ("Take Profit", "f8"), ("Profit/Loss ($)", "f8"),
+    ]
+
+# Swing rules over plain arrays, shared with multi_runner
+def run_trades(dates, low, high, close, sma_50, atr, support, resistance, pip_value=pip_value,
+               pip_in_dollars=pip_in_dollars, spread=spread, trades=None):
+    """
+    Find every swing entry and resolve its exit.
+
+    Entries do not depend on earlier trades, so they are found for all bars
+    at once and every exit is resolved in one batched barrier-index query.
+    Take profit wins if both levels are hit on the same bar, and trades that
+    reach neither level end with 0 P/L.
+
+    Args:
+        dates (array-like): Bar dates, stored in each trade's Date field.
+        low, high, close, sma_50, atr, support, resistance (array-like): Aligned columns.
+        pip_value (float): Price change of one pip.
+        pip_in_dollars (float): Dollar value of one pip.
+        spread (float): Price added to buys and taken off sells at entry.
+        trades (TradeLedger): Ledger or TradeWriter to add the trades to; a
+            new ledger if None.
+
+    Returns:
+        TradeLedger: One row per trade with trade_fields() columns.
+    """
+    dates = np.asarray(dates)
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    close = np.asarray(close, dtype=float)
+    sma_50 = np.asarray(sma_50, dtype=float)
+    atr = np.asarray(atr, dtype=float)
+    n = len(close)
+
+    # Bars with indicators, and a later bar to exit on
+    ready = ~np.isnan(sma_50) & ~np.isnan(atr) & (np.arange(n) + 1 < n)
+    buy = ready & (low <= np.asarray(support, dtype=float)) & (close > sma_50)
+    sell = ready & ~buy & (high >= np.asarray(resistance, dtype=float)) & (close < sma_50)
+    bars = np.flatnonzero(buy | sell)
+    direction = np.where(buy[bars], 1, -1)
+
+    # Entry accounts for the spread; stop 1.5 ATR and target 3 ATR away
+    entry_price = close[bars] + direction * spread
+    stop_loss = entry_price - direction * 1.5 * atr[bars]
+    take_profit = entry_price + direction * 3 * atr[bars]
+
+    # Index over Low/High so each trade's first stop loss / take profit touch is a
+    # logarithmic lookup instead of a scan over the rest of the data
+    exit_idx, stop_loss_hit = first_barrier_hits(
+        BarrierIndex(low, high), bars + 1, stop_loss, take_profit, direction, stop_wins_ties=False
+    )
+    outcome = np.where(stop_loss_hit, stop_loss - entry_price, np.where(exit_idx < n, take_profit - entry_price, 0))
+
+    if trades is None:
+        trades = TradeLedger(trade_fields(dates.dtype), capacity=len(bars))
+    trades.extend({
+        "Date": dates[bars], "Type": np.where(direction == 1, "Buy", "Sell"), "Entry": entry_price,
+        "Stop Loss": stop_loss, "Take Profit": take_profit, "Profit/Loss ($)": outcome / pip_value * pip_in_dollars,
+    })
+    return trades
+
 # Simulate swing trading
-for i in range(len(data)):
-    # Skip rows where indicators are not yet calculated
-    if pd.isna(data["SMA_50"].iloc[i]) or pd.isna(data["ATR"].iloc[i]):
-        continue
-
-    atr = data["ATR"].iloc[i]
-    position_size = (account_balance * risk_per_trade) / (atr * pip_in_dollars)  # Lot size
-
-    # Check for buy opportunity
-    if data["Low"].iloc[i] <= data["Support"].iloc[i] and data["Close"].iloc[i] > data["SMA_50"].iloc[i]:
-        entry_price = data["Close"].iloc[i] + spread  # Account for spread
-        stop_loss = entry_price - 1.5 * atr  # 1.5 ATR below entry
-        take_profit = entry_price + 3 * atr  # 3 ATR above entry
-
-        # Simulate trade outcome
-        future_prices = data.iloc[i + 1 :]
-        if not future_prices.empty:
-            stop_loss_hit = future_prices["Low"] <= stop_loss
-            take_profit_hit = future_prices["High"] >= take_profit
-
-            if stop_loss_hit.any() and take_profit_hit.any():
-                first_stop_loss_hit = stop_loss_hit.idxmax()
-                first_take_profit_hit = take_profit_hit.idxmax()
-                outcome = (
-                    stop_loss - entry_price if first_stop_loss_hit < first_take_profit_hit else take_profit - entry_price
-                )
-            elif stop_loss_hit.any():
-                outcome = stop_loss - entry_price
-            elif take_profit_hit.any():
-                outcome = take_profit - entry_price
-            else:
-                outcome = 0
-
-            data.at[i, "Type"] = "Buy"
-            data.at[i, "Entry"] = entry_price
-            data.at[i, "Stop Loss"] = stop_loss
-            data.at[i, "Take Profit"] = take_profit
-            data.at[i, "Profit/Loss ($)"] = outcome / pip_value * pip_in_dollars
-
-    # Check for sell opportunity
-    elif data["High"].iloc[i] >= data["Resistance"].iloc[i] and data["Close"].iloc[i] < data["SMA_50"].iloc[i]:
-        entry_price = data["Close"].iloc[i] - spread  # Account for spread
-        stop_loss = entry_price + 1.5 * atr  # 1.5 ATR above entry
-        take_profit = entry_price - 3 * atr  # 3 ATR below entry
-
-        # Simulate trade outcome
-        future_prices = data.iloc[i + 1 :]
-        if not future_prices.empty:
-            stop_loss_hit = future_prices["High"] >= stop_loss
-            take_profit_hit = future_prices["Low"] <= take_profit
-
-            if stop_loss_hit.any() and take_profit_hit.any():
-                first_stop_loss_hit = stop_loss_hit.idxmax()
-                first_take_profit_hit = take_profit_hit.idxmax()
-                outcome = (
-                    stop_loss - entry_price if first_stop_loss_hit < first_take_profit_hit else take_profit - entry_price
-                )
-            elif stop_loss_hit.any():
-                outcome = stop_loss - entry_price
-            elif take_profit_hit.any():
-                outcome = take_profit - entry_price
-            else:
-                outcome = 0
-
-            data.at[i, "Type"] = "Sell"
-            data.at[i, "Entry"] = entry_price
-            data.at[i, "Stop Loss"] = stop_loss
-            data.at[i, "Take Profit"] = take_profit
-            data.at[i, "Profit/Loss ($)"] = outcome / pip_value * pip_in_dollars
-
-# Filter rows with trades and save the results to a CSV file
-results = data.dropna(subset=["Type"])[["Date", "Type", "Entry", "Stop Loss", "Take Profit", "Profit/Loss ($)"]]
-results.to_csv("USDCHF_M30_xsb (1).csvSwing_Trading_Results.csv", index=False)
-
-print("Swing trading backtest results saved to 'USDCHF_M30_xsb (1).csv")
\ No newline at end of file
+def simulate_trades(data, pip_value=pip_value, pip_in_dollars=pip_in_dollars, spread=spread, trades=None):
+    return run_trades(
+        data["Date"], data["Low"], data["High"], data["Close"], data["SMA_50"], data["ATR"], data["Support"],
+        data["Resistance"], pip_value, pip_in_dollars, spread, trades,
+    )
+
+def main():
+    with span("load"):
+        data = load_data("USDCHF_M30_xsb (1).csv")
+    with span("indicators"):
+        data = calculate_indicators(data, legacy_atr=legacy_atr)
+        data = find_support_resistance(data)
+    # Save the trades to a CSV file, written in batches as they are added
+    output_file = "USDCHF_M30_xsb (1).csvSwing_Trading_Results.csv"
+    with span("simulate"), TradeWriter(output_file, trade_fields(data["Date"].dtype)) as trades:
+        simulate_trades(data, trades=trades)
+
+    print("Swing trading backtest results saved to 'USDCHF_M30_xsb (1).csv")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,430 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ledger import TradeLedger
+
+# Streaming, typed output for trades and result rows.
+#
+# A TradeWriter takes rows the same way a TradeLedger does (append,
+# update_last, extend) but only keeps the latest batch in memory: once
+# `batch_rows` rows are buffered they are written out, except the last
+# `hold` rows, which stay buffered so an open trade can still be closed with
+# update_last. A run of any length therefore needs memory for one batch.
+#
+# Batches go to one of four formats:
+#   parquet  Parquet row groups (needs pyarrow)
+#   arrow    Arrow IPC file, one record batch per flush (needs pyarrow)
+#   columns  a directory with one raw append-only file per column and a
+#            meta.json holding names, dtypes and the row count; needs only
+#            NumPy and is read back memory-mapped
+#   csv      the plain CSV the strategy scripts write; the only format that
+#            can also be appended to (mode='a'), as the live trade log is
+# The format follows the file extension (.parquet, .arrow/.feather, .csv);
+# any other path uses parquet when pyarrow is installed and columns otherwise.
+# Object fields (such as dates fed in as strings or Timestamps) have no fixed
+# binary type: Parquet and Arrow store them as strings, and the columns
+# format does not support them.
+#
+# read_trades() and iter_batches() load any of these back, optionally only
+# some of the columns, and export_csv() converts a file to CSV batch by batch.
+# check_formats() (or running this module) round-trips sample trades through
+# every format that can be written here.
+
+FORMATS = ('parquet', 'arrow', 'columns', 'csv')
+
+EXTENSIONS = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.csv': 'csv',
+}
+
+META_FILE = 'meta.json'
+
+
+def _pyarrow():
+    import pyarrow as pa
+
+    return pa
+
+
+def _have_pyarrow():
+    try:
+        _pyarrow()
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_format(path, format=None):
+    """The format used for `path`: `format` if given, else by extension, else parquet or columns."""
+    if format is not None:
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}.")
+        return format
+    if os.path.isdir(path):
+        return 'columns'
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXTENSIONS:
+        return EXTENSIONS[extension]
+    return 'parquet' if _have_pyarrow() else 'columns'
+
+
+def _is_columns_output(path):
+    # A directory written by _ColumnSink: meta.json plus N.bin column files
+    names = os.listdir(path)
+    return META_FILE in names and all(
+        name in (META_FILE, META_FILE + '.tmp') or (name.endswith('.bin') and name[:-4].isdigit()) for name in names
+    )
+
+
+class _ColumnSink:
+    # One raw file per column, appended to on every flush. meta.json is
+    # rewritten after the data so a reader never sees rows that are missing.
+    # Only a previous columns output is ever replaced; any other existing
+    # directory is left alone.
+    def __init__(self, path, dtype):
+        if any(dtype[name].kind == 'O' for name in dtype.names):
+            raise TypeError("The columns format cannot store object fields; give them a fixed dtype or use csv.")
+        if os.path.isdir(path):
+            if not _is_columns_output(path):
+                raise FileExistsError(f"{path} is a directory that does not hold a columns output; not replacing it.")
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            raise FileExistsError(f"{path} exists and is not a columns output directory.")
+        os.makedirs(path)
+        self.path = path
+        self.dtype = dtype
+        self.length = 0
+        self.files = [open(os.path.join(path, f'{i}.bin'), 'wb') for i in range(len(dtype.names))]
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            'columns': [{'name': name, 'dtype': self.dtype[name].str} for name in self.dtype.names],
+            'length': self.length,
+        }
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def write(self, columns):
+        for f, name in zip(self.files, self.dtype.names):
+            np.ascontiguousarray(columns[name], dtype=self.dtype[name]).tofile(f)
+            f.flush()
+        self.length += len(columns[self.dtype.names[0]])
+        self._write_meta()
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+class _CsvSink:
+    # Same output as DataFrame.to_csv(index=False) on all the rows, except that
+    # pandas decides per batch whether datetimes are written with a time. In
+    # append mode the header is only written to a new or empty file.
+    def __init__(self, path, dtype, mode='w'):
+        new = mode == 'w' or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, mode, newline='')
+        if new:
+            self.file.write(','.join(dtype.names) + '\n')
+            self.file.flush()
+
+    def write(self, columns):
+        pd.DataFrame(columns, copy=False).to_csv(self.file, header=False, index=False)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowSink:
+    def __init__(self, path, dtype, format):
+        pa = _pyarrow()
+        self.pa = pa
+        self.names = list(dtype.names)
+        self.objects = [name for name in self.names if dtype[name].kind == 'O']
+        # Fixed-width NumPy strings become variable-length Arrow strings, and
+        # object fields are written as strings
+        self.schema = pa.schema([
+            (name, pa.string() if dtype[name].kind in 'UO' else pa.from_numpy_dtype(dtype[name]))
+            for name in self.names
+        ])
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, columns):
+        columns = dict(columns)
+        for name in self.objects:
+            columns[name] = [None if value is None else str(value) for value in columns[name]]
+        arrays = [self.pa.array(columns[name], type=self.schema.field(name).type) for name in self.names]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class TradeWriter:
+    """
+    Trade rows written to disk in batches instead of held until the end.
+
+    Args:
+        path (str): Output file, or directory for the columns format. An
+            existing directory is only replaced if it holds a previous
+            columns output; otherwise FileExistsError is raised.
+        fields: (name, dtype) pairs as for TradeLedger. If None, the fields
+            are taken from the first extend() call's arrays.
+        format (str): One of FORMATS; see resolve_format for the default.
+        batch_rows (int): Rows buffered before a batch is written.
+        hold (int): Most recent rows kept back at every automatic flush, so
+            update_last can still change them.
+        mode (str): 'w' to start a new file, or 'a' to add rows to an existing
+            CSV (csv format only).
+    """
+
+    def __init__(self, path, fields=None, format=None, batch_rows=65_536, hold=1, mode='w'):
+        self.path = path
+        self.format = resolve_format(path, format)
+        if self.format in ('parquet', 'arrow') and not _have_pyarrow():
+            raise ImportError(f"The {self.format} format needs pyarrow; use format='columns' or 'csv' instead.")
+        if mode not in ('w', 'a') or (mode == 'a' and self.format != 'csv'):
+            raise ValueError("mode must be 'w', or 'a' for the csv format.")
+        self.mode = mode
+        self.batch_rows = max(batch_rows, hold + 1)
+        self.hold = hold
+        self.rows_written = 0
+        self.buffer = None
+        self.sink = None
+        if fields is not None:
+            self._open(np.dtype(fields))
+
+    def _open(self, dtype):
+        self.buffer = TradeLedger(dtype, capacity=self.batch_rows)
+        if self.format == 'columns':
+            self.sink = _ColumnSink(self.path, dtype)
+        elif self.format == 'csv':
+            self.sink = _CsvSink(self.path, dtype, self.mode)
+        else:
+            self.sink = _ArrowSink(self.path, dtype, self.format)
+
+    def __len__(self):
+        return self.rows_written + (len(self.buffer) if self.buffer is not None else 0)
+
+    def __getitem__(self, name):
+        """Column `name` of the rows still buffered."""
+        return self.buffer[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, *values, **named):
+        """Add one row, as TradeLedger.append."""
+        self.buffer.append(*values, **named)
+        if len(self.buffer) >= self.batch_rows:
+            self.flush(self.hold)
+
+    def update_last(self, **values):
+        """Overwrite fields of the most recent row, which is always still buffered."""
+        self.buffer.update_last(**values)
+
+    def extend(self, columns):
+        """Append many rows from a mapping of field name -> equal-length array, a batch at a time."""
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+        if self.buffer is None:
+            self._open(np.dtype([(name, values.dtype) for name, values in columns.items()]))
+        size = len(next(iter(columns.values()))) if columns else 0
+        for start in range(0, size, self.batch_rows):
+            self.buffer.extend({name: values[start:start + self.batch_rows] for name, values in columns.items()})
+            if len(self.buffer) >= self.batch_rows:
+                self.flush(self.hold)
+
+    def flush(self, keep=0):
+        """Write every buffered row except the last `keep`."""
+        if self.buffer is None or len(self.buffer) <= keep:
+            return
+        columns = self.buffer.drain(keep)
+        self.sink.write(columns)
+        self.rows_written += len(columns[self.buffer.names[0]])
+
+    def close(self):
+        """Write the remaining rows and close the file."""
+        if self.sink is None:
+            return
+        self.flush()
+        self.sink.close()
+        self.sink = None
+
+
+def _read_meta(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def _column_file(path, meta, name):
+    i = [column['name'] for column in meta['columns']].index(name)
+    dtype = np.dtype(meta['columns'][i]['dtype'])
+    if meta['length'] == 0:
+        return np.empty(0, dtype=dtype)
+    # Copy-on-write map: zero-copy reads, private writes
+    return np.memmap(os.path.join(path, f'{i}.bin'), dtype=dtype, mode='c', shape=(meta['length'],))
+
+
+def column_names(path, format=None):
+    """Names of the columns stored at `path`."""
+    format = resolve_format(path, format)
+    if format == 'columns':
+        return [column['name'] for column in _read_meta(path)['columns']]
+    if format == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = _pyarrow()
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    with pa.ipc.open_file(path) as reader:
+        return reader.schema.names
+
+
+def iter_batches(path, columns=None, format=None, batch_rows=65_536):
+    """
+    Yield a file written by TradeWriter (or any CSV) as DataFrames of up to `batch_rows` rows.
+
+    Args:
+        path (str): File or columns directory.
+        columns (list): Columns to load; all if None.
+        format (str): See resolve_format.
+        batch_rows (int): Rows per yielded frame (record batch size for arrow).
+    """
+    format = resolve_format(path, format)
+    if format == 'columns':
+        meta = _read_meta(path)
+        names = columns or [column['name'] for column in meta['columns']]
+        arrays = {name: _column_file(path, meta, name) for name in names}
+        for start in range(0, meta['length'], batch_rows):
+            yield pd.DataFrame({name: values[start:start + batch_rows] for name, values in arrays.items()})
+    elif format == 'csv':
+        with pd.read_csv(path, usecols=columns, chunksize=batch_rows, float_precision='round_trip') as reader:
+            yield from reader
+    elif format == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        pa = _pyarrow()
+        with pa.ipc.open_file(path) as reader:
+            for k in range(reader.num_record_batches):
+                batch = reader.get_batch(k)
+                yield (batch.select(columns) if columns else batch).to_pandas()
+
+
+def read_trades(path, columns=None, format=None):
+    """
+    Load a file written by TradeWriter (or any CSV).
+
+    Args:
+        path (str): File or columns directory.
+        columns (list): Columns to load; all if None. Columnar formats only
+            read these from disk.
+        format (str): See resolve_format. CSV floats are parsed to the exact
+            values that were written.
+
+    Returns:
+        pd.DataFrame: The stored rows. Columns-format numeric columns are
+        memory-mapped rather than read into memory.
+    """
+    format = resolve_format(path, format)
+    if format == 'columns':
+        meta = _read_meta(path)
+        names = columns or [column['name'] for column in meta['columns']]
+        return pd.DataFrame({name: _column_file(path, meta, name) for name in names}, copy=False)
+    if format == 'csv':
+        return pd.read_csv(path, usecols=columns, float_precision='round_trip')
+    if format == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    pa = _pyarrow()
+    with pa.ipc.open_file(path) as reader:
+        table = reader.read_all()
+    return (table.select(columns) if columns else table).to_pandas()
+
+
+def export_csv(path, csv_path, columns=None, format=None, batch_rows=65_536):
+    """Convert a TradeWriter file to CSV one batch at a time."""
+    names = columns or column_names(path, format)
+    with open(csv_path, 'w', newline='') as out:
+        out.write(','.join(names) + '\n')
+        for batch in iter_batches(path, columns, format, batch_rows):
+            batch.to_csv(out, header=False, index=False)
+
+
+def check_formats(directory):
+    """
+    Write sample trades in every format available here and read them back.
+
+    Parquet and Arrow are only checked when pyarrow is installed; object
+    fields are only included for the formats that store them.
+
+    Args:
+        directory (str): Where the sample files are written.
+
+    Returns:
+        dict: Format -> True when the rows read back equal the rows written.
+    """
+    rows = 1000
+    sample = {
+        'Type': np.where(np.arange(rows) % 3 == 0, 'Sell', 'Buy'),
+        'Entry': np.linspace(1.0, 2.0, rows),
+        'Bar': np.arange(rows, dtype=np.int64),
+        'Date': pd.date_range('2024-01-01 09:30', periods=rows, freq='37min').to_numpy(),
+        'Note': np.array([None if i % 7 == 0 else f'trade {i}' for i in range(rows)], dtype=object),
+    }
+    sample['Entry'][::11] = np.nan
+    extensions = {'parquet': '.parquet', 'arrow': '.arrow', 'columns': '', 'csv': '.csv'}
+    results = {}
+    for format in FORMATS:
+        if format in ('parquet', 'arrow') and not _have_pyarrow():
+            continue
+        columns = {name: values for name, values in sample.items() if format != 'columns' or name != 'Note'}
+        path = os.path.join(directory, f'check_{format}{extensions[format]}')
+        # Small batches, so several flushes and the held-back row are exercised
+        with TradeWriter(path, [(name, values.dtype) for name, values in columns.items()], format, batch_rows=64) as writer:
+            for start in range(0, rows, 100):
+                writer.extend({name: values[start:start + 100] for name, values in columns.items()})
+        expected = pd.DataFrame(columns)
+        stored = read_trades(path, format=format)
+        if format == 'csv':
+            stored['Date'] = pd.to_datetime(stored['Date']).to_numpy()
+        results[format] = all(
+            _same_values(stored[name].to_numpy(), expected[name].to_numpy()) for name in expected.columns
+        )
+    return results
+
+
+def _same_values(stored, expected):
+    if expected.dtype.kind == 'O':
+        # Strings come back as strings and missing values as None or NaN
+        return all((pd.isna(b) and pd.isna(a)) or a == b for a, b in zip(stored, expected))
+    if expected.dtype.kind == 'M':
+        return np.array_equal(stored.astype('M8[ns]'), expected.astype('M8[ns]'))
+    return np.array_equal(stored.astype(expected.dtype), expected, equal_nan=expected.dtype.kind == 'f')
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        for format, same in check_formats(directory).items():
+            print(f"{format}: {'ok' if same else 'DIFFERENT'}")
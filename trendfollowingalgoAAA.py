@@ -1,6 +1,13 @@
 import pandas as pd
 import numpy as np
 
+from data_loader import load_csv
+from events import signal_flips
+from indicators import atr, sma
+from instrumentation import span
+from ledger import TradeLedger
+from trade_writer import TradeWriter
+
 # Parameters
 short_window = 50  # 50-hour SMA
 long_window = 200  # 200-hour SMA
@@ -12,65 +19,100 @@ pip_value = 0.0001  # Value of 1 pip for USD/CHF
 pip_worth = 10  # $10 per pip for a standard lot
 
 # Load CSV file
-file_path = "EURUSD_M5_mt.csv"  # Adjust the file path if necessary
-data = pd.read_csv(file_path)
-
-# Ensure 'Date' column is in datetime format
-data["Date"] = pd.to_datetime(data["Date"])
-
-# Sort by date if not already sorted
-data = data.sort_values(by="Date").reset_index(drop=True)
-
-# Calculate Moving Averages
-data["SMA_50"] = data["Close"].rolling(window=short_window).mean()
-data["SMA_200"] = data["Close"].rolling(window=long_window).mean()
-
-# Calculate Average True Range (ATR)
-data["High-Low"] = data["High"] - data["Low"]
-data["High-Close"] = abs(data["High"] - data["Close"].shift(1))
-data["Low-Close"] = abs(data["Low"] - data["Close"].shift(1))
-data["True Range"] = data[["High-Low", "High-Close", "Low-Close"]].max(axis=1)
-data["ATR"] = data["True Range"].rolling(window=atr_period).mean()
-
-# Define trade signals
-data["Signal"] = 0
-data.loc[data["SMA_50"] > data["SMA_200"], "Signal"] = 1  # Buy Signal
-data.loc[data["SMA_50"] < data["SMA_200"], "Signal"] = -1  # Sell Signal
-
-# Simulate trades
-trades = []
-for i in range(1, len(data)):
-    if data["Signal"].iloc[i] == 1 and data["Signal"].iloc[i - 1] <= 0:  # Buy Signal
-        entry_price = data["Close"].iloc[i]
-        stop_loss = entry_price - data["ATR"].iloc[i]  # Stop Loss
-        take_profit = entry_price + (data["ATR"].iloc[i] * risk_reward_ratio)  # Take Profit
-        profit_loss_pips = (take_profit - entry_price) / pip_value  # P&L in pips
-        trades.append({
-            "Date": data["Date"].iloc[i],
-            "Type": "Buy",
-            "Entry": entry_price,
-            "Stop Loss": stop_loss,
-            "Take Profit": take_profit,
-            "Profit/Loss ($)": profit_loss_pips * pip_worth  # P&L in USD
-        })
-    elif data["Signal"].iloc[i] == -1 and data["Signal"].iloc[i - 1] >= 0:  # Sell Signal
-        entry_price = data["Close"].iloc[i]
-        stop_loss = entry_price + data["ATR"].iloc[i]  # Stop Loss
-        take_profit = entry_price - (data["ATR"].iloc[i] * risk_reward_ratio)  # Take Profit
-        profit_loss_pips = (entry_price - take_profit) / pip_value  # P&L in pips
-        trades.append({
-            "Date": data["Date"].iloc[i],
-            "Type": "Sell",
-            "Entry": entry_price,
-            "Stop Loss": stop_loss,
-            "Take Profit": take_profit,
-            "Profit/Loss ($)": profit_loss_pips * pip_worth  # P&L in USD
-        })
-
-# Output trades
-trades_df = pd.DataFrame(trades)
-print(trades_df)
-
-# Save to CSV
-trades_df.to_csv("EURUSD_M5_mt.csv_trades_with_profit_loss2.csv", index=False)
-print("Trades saved to 'EURUSD_M5_mt.csv.csv_trades_with_profit_loss2.csv'")
\ No newline at end of file
+def load_data(file_path):
+    data = load_csv(file_path, parse_dates=["Date"])  # 'Date' is parsed to datetime
+
+    # Sort by date if not already sorted
+    return data.sort_values(by="Date").reset_index(drop=True)
+
+def calculate_indicators(data):
+    # Calculate Moving Averages
+    data["SMA_50"] = sma(data["Close"], short_window)
+    data["SMA_200"] = sma(data["Close"], long_window)
+
+    # Calculate Average True Range (ATR)
+    data["ATR"] = atr(data["High"], data["Low"], data["Close"], atr_period)
+
+    # Define trade signals
+    data["Signal"] = crossover_signal(data["SMA_50"], data["SMA_200"])
+    return data
+
+# 1 (buy) while the short SMA is above the long one, -1 (sell) while below, else 0
+def crossover_signal(short_sma, long_sma):
+    short_sma, long_sma = np.asarray(short_sma), np.asarray(long_sma)
+    return np.where(short_sma > long_sma, 1, np.where(short_sma < long_sma, -1, 0))
+
+# Trade rows produced by simulate_trades
+def trade_fields(date_dtype):
+    return [
+        ("Date", date_dtype), ("Type", "U4"), ("Entry", "f8"), ("Stop Loss", "f8"),
+        ("Take Profit", "f8"), ("Profit/Loss ($)", "f8"),
+    ]
+
+# Trend rules over plain arrays, shared with walk_forward
+def run_trades(dates, close, signal, atr_values, risk_reward_ratio=risk_reward_ratio, pip_value=pip_value,
+               pip_worth=pip_worth, start=1, trades=None):
+    """
+    Open a trade on every bar from `start` on where the signal flips.
+
+    Trades do not depend on each other, so they are built column-wise from
+    the flip bars without a loop over the data.
+
+    Args:
+        dates, close, signal, atr_values (array-like): Aligned columns; `dates`
+            fills the Date field and may hold bar numbers instead of dates.
+        start (int): First bar that can open a trade; earlier bars only give
+            the signal it flips from.
+        trades (TradeLedger): Ledger to add to, or a TradeWriter to stream the
+            rows to a file.
+
+    Returns:
+        TradeLedger: `trades`, or a new ledger of trade_fields rows.
+    """
+    dates, signal = np.asarray(dates), np.asarray(signal)
+    buys, sells = signal_flips(signal, start)
+    bars = np.union1d(buys, sells)
+    is_buy = signal[bars] == 1
+    entry_price = np.asarray(close)[bars]
+    atr_values = np.asarray(atr_values)[bars]
+
+    stop_loss = np.where(is_buy, entry_price - atr_values, entry_price + atr_values)  # Stop Loss
+    take_profit = np.where(
+        is_buy, entry_price + (atr_values * risk_reward_ratio), entry_price - (atr_values * risk_reward_ratio)
+    )  # Take Profit
+    profit_loss_pips = np.where(is_buy, take_profit - entry_price, entry_price - take_profit) / pip_value  # P&L in pips
+
+    if trades is None:
+        trades = TradeLedger(trade_fields(dates.dtype), capacity=len(bars))
+    trades.extend({
+        "Date": dates[bars],
+        "Type": np.where(is_buy, "Buy", "Sell"),
+        "Entry": entry_price,
+        "Stop Loss": stop_loss,
+        "Take Profit": take_profit,
+        "Profit/Loss ($)": profit_loss_pips * pip_worth,  # P&L in USD
+    })
+    return trades
+
+# Simulate trades; they are added to `trades` (a TradeLedger or TradeWriter) if given
+def simulate_trades(data, pip_value=pip_value, pip_worth=pip_worth, trades=None):
+    return run_trades(data["Date"].to_numpy(), data["Close"].to_numpy(), data["Signal"].to_numpy(),
+                      data["ATR"].to_numpy(), risk_reward_ratio, pip_value, pip_worth, trades=trades)
+
+def main():
+    file_path = "EURUSD_M5_mt.csv"  # Adjust the file path if necessary
+    with span("load"):
+        data = load_data(file_path)
+    with span("indicators"):
+        data = calculate_indicators(data)
+    # Save to CSV, written in batches as the trades are added
+    output_file = "EURUSD_M5_mt.csv_trades_with_profit_loss2.csv"
+    with span("simulate"), TradeWriter(output_file, trade_fields(data["Date"].dtype)) as trades:
+        simulate_trades(data, trades=trades)
+
+    # Output trades
+    print(f"Total Trades: {len(trades)}")
+    print("Trades saved to 'EURUSD_M5_mt.csv.csv_trades_with_profit_loss2.csv'")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,188 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import trendfollowingalgoAAA as trend
+from indicators import atr, sma
+from shared_arrays import SharedArrays, attach
+
+# Walk-forward evaluation of trendfollowingalgoAAA's SMA crossover strategy.
+#
+# The timeline is split into folds of an in-sample window followed by an
+# out-of-sample window. In each fold every parameter combination is scored on
+# the in-sample bars, and the best one is traded on the out-of-sample bars.
+#
+# Every SMA and ATR the parameter grid needs is computed once over the full
+# series and shared with the worker processes through memory-mapped arrays.
+# A fold only slices views of those arrays, so nothing is recomputed per fold
+# and the indicators have their full warm-up history at every fold boundary.
+
+DEFAULT_PARAMS = {
+    'short_window': trend.short_window,
+    'long_window': trend.long_window,
+    'risk_reward_ratio': trend.risk_reward_ratio,
+    'atr_period': trend.atr_period,
+}
+
+# Arrays attached in each worker process by _init_worker
+_columns = None
+
+
+def _init_worker(spec):
+    global _columns
+    _columns = attach(spec)
+
+
+def make_folds(n_bars, in_sample, out_of_sample, step=None, anchored=False):
+    """
+    Split `n_bars` bars into walk-forward folds.
+
+    Args:
+        n_bars (int): Length of the series.
+        in_sample (int): Bars in each in-sample window.
+        out_of_sample (int): Bars in each out-of-sample window.
+        step (int): Bars between fold starts. Defaults to `out_of_sample`, so
+            out-of-sample windows tile the timeline without overlapping.
+        anchored (bool): Keep every in-sample window starting at bar 0.
+
+    Returns:
+        list: (is_start, oos_start, oos_stop) bar positions per fold.
+    """
+    step = step or out_of_sample
+    folds = []
+    oos_start = in_sample
+    while oos_start + out_of_sample <= n_bars:
+        is_start = 0 if anchored else oos_start - in_sample
+        folds.append((is_start, oos_start, oos_start + out_of_sample))
+        oos_start += step
+    return folds
+
+
+def _trades(columns, params, start, stop, pip_value, pip_worth):
+    # trendfollowingalgoAAA's own trade rules over bars [start, stop); the
+    # bar before `start` is included only for the signal it flips from
+    first = max(start, 1) - 1
+    short = columns[f"sma_{params['short_window']}"][first:stop]
+    long = columns[f"sma_{params['long_window']}"][first:stop]
+    trades = trend.run_trades(
+        np.arange(first, stop), columns['close'][first:stop], trend.crossover_signal(short, long),
+        columns[f"atr_{params['atr_period']}"][first:stop], params['risk_reward_ratio'], pip_value, pip_worth,
+    )
+    # Date holds the bar numbers here
+    return trades['Date'], trades['Profit/Loss ($)']
+
+
+def _evaluate_fold(task):
+    fold, (is_start, oos_start, oos_stop), combinations, pip_value, pip_worth = task
+    in_sample = np.array([
+        sum(_trades(_columns, params, is_start, oos_start, pip_value, pip_worth)[1].tolist())
+        for params in combinations
+    ])
+    # A combination whose ATR is NaN on a trade scores NaN and cannot be picked;
+    # if none scores, the fold trades the first combination
+    best = 0 if np.isnan(in_sample).all() else int(np.nanargmax(in_sample))
+    params = combinations[best]
+    bars, profit_loss = _trades(_columns, params, oos_start, oos_stop, pip_value, pip_worth)
+    row = {
+        'fold': fold,
+        'is_start': is_start,
+        'oos_start': oos_start,
+        'oos_stop': oos_stop,
+        **params,
+        'is_net_profit': float(in_sample[best]),
+        'oos_net_profit': sum(profit_loss.tolist()),
+        'oos_trades': len(bars),
+        'oos_win_rate': float(np.mean(profit_loss > 0)) if len(bars) else np.nan,
+    }
+    return row, bars, profit_loss
+
+
+def _indicator_columns(data, combinations):
+    high, low, close = data['High'], data['Low'], data['Close']
+    columns = {'close': close.to_numpy(dtype=float)}
+    windows = {params['short_window'] for params in combinations} | {params['long_window'] for params in combinations}
+    for window in sorted(windows):
+        columns[f'sma_{window}'] = sma(close, window)
+    for period in sorted({params['atr_period'] for params in combinations}):
+        columns[f'atr_{period}'] = atr(high, low, close, period)
+    return columns
+
+
+def run_walk_forward(data, in_sample, out_of_sample, param_grid=None, step=None, anchored=False,
+                     max_workers=None, pip_value=trend.pip_value, pip_worth=trend.pip_worth):
+    """
+    Walk-forward evaluation of the trend-following strategy, with folds run in parallel.
+
+    Args:
+        data (pd.DataFrame): Frame from trendfollowingalgoAAA.load_data.
+        in_sample (int): Bars per in-sample window.
+        out_of_sample (int): Bars per out-of-sample window.
+        param_grid (dict): Parameter name -> candidate values; missing parameters
+            use DEFAULT_PARAMS. Without a grid every fold trades the defaults.
+        step (int): Bars between fold starts (see make_folds).
+        anchored (bool): Grow the in-sample window from bar 0 instead of rolling it.
+        max_workers (int): Worker processes. Defaults to the CPU count.
+
+    Returns:
+        tuple: (folds, equity) where `folds` is a DataFrame of per-fold metrics
+        and `equity` is the cumulative out-of-sample P/L per bar, stitched
+        across folds and indexed by Date.
+    """
+    param_grid = {**{name: [value] for name, value in DEFAULT_PARAMS.items()}, **(param_grid or {})}
+    names = list(param_grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    folds = make_folds(len(data), in_sample, out_of_sample, step, anchored)
+    if not folds:
+        print("Not enough bars for one in-sample and one out-of-sample window.")
+        return pd.DataFrame(), pd.Series(dtype=float, name='Equity')
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(folds))
+    tasks = [(fold, bounds, combinations, pip_value, pip_worth) for fold, bounds in enumerate(folds)]
+    with SharedArrays(_indicator_columns(data, combinations)) as shared:
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(shared.spec,)) as executor:
+            results = list(executor.map(_evaluate_fold, tasks))
+
+    # Stitch the out-of-sample windows in time order; with step < out_of_sample
+    # windows overlap and each bar is taken from the latest fold covering it
+    profit_loss = np.zeros(len(data))
+    covered = np.zeros(len(data), dtype=bool)
+    for (_, oos_start, oos_stop), (_, bars, fold_profit_loss) in zip(folds, results):
+        profit_loss[oos_start:oos_stop] = 0.0
+        profit_loss[bars] = fold_profit_loss
+        covered[oos_start:oos_stop] = True
+    equity = pd.Series(np.cumsum(profit_loss[covered]), index=data['Date'][covered], name='Equity')
+
+    table = pd.DataFrame([row for row, _, _ in results])
+    dates = data['Date'].to_numpy()
+    table.insert(1, 'oos_start_date', dates[table['oos_start']])
+    table.insert(2, 'oos_end_date', dates[table['oos_stop'] - 1])
+    return table, equity
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward evaluation of the trend-following strategy.')
+    parser.add_argument('file_path', nargs='?', default='EURUSD_M5_mt.csv')
+    parser.add_argument('--in-sample', type=int, default=12 * 24 * 60, help='In-sample bars (default: 60 days of M5)')
+    parser.add_argument('--out-of-sample', type=int, default=12 * 24 * 20, help='Out-of-sample bars (default: 20 days of M5)')
+    parser.add_argument('--anchored', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    data = trend.load_data(args.file_path)
+    folds, equity = run_walk_forward(data, args.in_sample, args.out_of_sample, param_grid={
+        'short_window': [20, 50, 100],
+        'long_window': [200, 400],
+        'risk_reward_ratio': [1, 2, 3],
+        'atr_period': [14, 28],
+    }, anchored=args.anchored, max_workers=args.workers)
+    print(folds.to_string())
+    if len(equity):
+        print(f"Out-of-sample P/L over {len(folds)} folds: ${equity.iloc[-1]:.2f}")
+
+
+if __name__ == '__main__':
+    main()